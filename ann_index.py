@@ -0,0 +1,256 @@
+import json
+import os
+import threading
+
+import numpy as np
+from langchain_core.documents import Document
+
+from flat_index import SimilarityRetriever, _write_json
+from vector_index import (
+    CHROMA_DB_PATH,
+    EMBEDDING_MODEL_NAME,
+    WRITE_BATCH_SIZE,
+    check_embedding_identity,
+    chunk_id,
+    index_fingerprint,
+    stored_embedding_identity,
+)
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+
+ANN_INDEX_DIRNAME = "hnsw"
+ANN_INDEX_PATH = os.path.join(CHROMA_DB_PATH, ANN_INDEX_DIRNAME)
+ANN_INDEX_VERSION = 1
+HNSW_M = int(os.getenv("YOGA_HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("YOGA_HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("YOGA_HNSW_EF_SEARCH", "64"))
+HNSW_GROWTH = 1.5
+
+
+def _require_hnswlib():
+    if hnswlib is None:
+        raise ImportError("The hnsw vector backend needs hnswlib: pip install hnswlib")
+
+
+class HnswVectorStore:
+    def __init__(self, embeddings, path: str, meta: dict, index, ids: dict, texts: dict):
+        self.embeddings = embeddings
+        self.path = path
+        self.meta = meta
+        self.index = index
+        self.ids = ids
+        self.texts = texts
+        self.labels = {id_: label for label, id_ in ids.items()}
+        # hnswlib does not allow inserts concurrently with queries, so live
+        # updates and searches take turns; queries are sub-millisecond.
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(
+        cls,
+        embeddings,
+        path: str,
+        dim: int,
+        model_name: str = EMBEDDING_MODEL_NAME,
+        m: int = HNSW_M,
+        ef_construction: int = HNSW_EF_CONSTRUCTION,
+        ef_search: int = HNSW_EF_SEARCH,
+        capacity: int = 1024,
+    ):
+        _require_hnswlib()
+        index = hnswlib.Index(space="cosine", dim=dim)
+        index.init_index(max_elements=capacity, M=m, ef_construction=ef_construction, allow_replace_deleted=True)
+        index.set_ef(ef_search)
+        meta = {
+            "version": ANN_INDEX_VERSION,
+            "model": model_name,
+            "dim": dim,
+            "m": m,
+            "ef_construction": ef_construction,
+            "ef_search": ef_search,
+            "next_label": 0,
+        }
+        return cls(embeddings, path, meta, index, {}, {})
+
+    @classmethod
+    def open(cls, path: str, embeddings, model_name: str = EMBEDDING_MODEL_NAME, ef_search: int | None = None):
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        _require_hnswlib()
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != ANN_INDEX_VERSION or meta.get("model") != model_name:
+            return None
+
+        with open(os.path.join(path, "documents.json"), "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        ids = {int(label): id_ for label, id_ in payload["ids"].items()}
+        texts = {int(label): text for label, text in payload["texts"].items()}
+
+        index = hnswlib.Index(space="cosine", dim=meta["dim"])
+        index.load_index(os.path.join(path, "index.bin"), allow_replace_deleted=True)
+        index.set_ef(ef_search or meta["ef_search"])
+        return cls(embeddings, path, meta, index, ids, texts)
+
+    @classmethod
+    def sync(
+        cls,
+        chunks,
+        embeddings,
+        path: str = ANN_INDEX_PATH,
+        model_name: str = EMBEDDING_MODEL_NAME,
+        batch_size: int = WRITE_BATCH_SIZE,
+        allow_rebuild: bool = False,
+        **params,
+    ):
+        check_embedding_identity(stored_embedding_identity(path), model_name, f"HNSW index at {path!r}", allow_rebuild)
+        wanted = {}
+        for chunk in chunks:
+            wanted.setdefault(chunk_id(chunk, model_name), chunk)
+        fingerprint = index_fingerprint(wanted)
+
+        store = cls.open(path, embeddings, model_name)
+        if store is not None and store.meta.get("fingerprint") == fingerprint:
+            return store, {"added": 0, "deleted": 0, "total": len(wanted), "fingerprint": fingerprint}
+
+        stale = [id_ for id_ in store.labels if id_ not in wanted] if store is not None else []
+        missing = [id_ for id_ in wanted if store is None or id_ not in store.labels]
+
+        if store is not None:
+            store.delete(stale)
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            vectors = embeddings.embed_documents([wanted[id_] for id_ in batch])
+            if store is None:
+                store = cls.create(embeddings, path, len(vectors[0]), model_name, capacity=len(wanted) or 1, **params)
+            store.add_vectors(batch, [wanted[id_] for id_ in batch], vectors)
+
+        if store is None:
+            # Nothing to embed, so ask the model for its dimension and start
+            # an empty index, as the flat backend does for an empty corpus.
+            dim = len(embeddings.embed_query("yoga"))
+            store = cls.create(embeddings, path, dim, model_name, capacity=1, **params)
+
+        store.meta["fingerprint"] = fingerprint
+        store.save()
+        return store, {"added": len(missing), "deleted": len(stale), "total": len(wanted), "fingerprint": fingerprint}
+
+    def add_vectors(self, ids, texts, vectors) -> None:
+        needed = self.index.get_current_count() + len(ids)
+        if needed > self.index.get_max_elements():
+            self.index.resize_index(max(needed, int(self.index.get_max_elements() * HNSW_GROWTH)))
+
+        labels = []
+        for id_, text in zip(ids, texts):
+            label = self.meta["next_label"]
+            self.meta["next_label"] += 1
+            self.ids[label] = id_
+            self.texts[label] = text
+            self.labels[id_] = label
+            labels.append(label)
+        self.index.add_items(np.asarray(vectors, dtype=np.float32), labels, replace_deleted=True)
+
+    def add_texts(self, texts, model_name: str | None = None) -> list[str]:
+        model_name = model_name or self.meta["model"]
+        new = {}
+        for text in texts:
+            id_ = chunk_id(text, model_name)
+            if id_ not in self.labels:
+                new.setdefault(id_, text)
+        if new:
+            self.add_vectors(list(new), list(new.values()), self.embeddings.embed_documents(list(new.values())))
+        return list(new)
+
+    def apply_changes(self, upserts: dict, deletes) -> "HnswVectorStore":
+        # Updated in place: unlike the flat matrix, the graph is too large to
+        # copy per edit. Embedding happens before the lock is taken.
+        new = {id_: text for id_, text in upserts.items() if id_ not in self.labels}
+        vectors = self.embeddings.embed_documents(list(new.values())) if new else []
+        with self._lock:
+            if new:
+                self.add_vectors(list(new), list(new.values()), vectors)
+            self.delete(deletes)
+            self.meta["fingerprint"] = index_fingerprint(self.labels)
+        return self
+
+    def delete(self, ids) -> None:
+        for id_ in ids:
+            label = self.labels.pop(id_, None)
+            if label is None:
+                continue
+            self.index.mark_deleted(label)
+            del self.ids[label]
+            del self.texts[label]
+
+    def save(self) -> None:
+        # Same scheme as FlatVectorStore.save: everything is written to
+        # temporaries, meta.json is removed while the graph and labels are
+        # swapped in and restored last, so an interrupted save is ignored
+        # by open() instead of pairing a new graph with old labels.
+        os.makedirs(self.path, exist_ok=True)
+        index_path = os.path.join(self.path, "index.bin")
+        documents_path = os.path.join(self.path, "documents.json")
+        meta_path = os.path.join(self.path, "meta.json")
+        with self._lock:
+            self.index.save_index(index_path + ".tmp")
+            documents = {"ids": dict(self.ids), "texts": dict(self.texts)}
+            meta = dict(self.meta)
+        documents_tmp_path = _write_json(documents_path, documents)
+        meta_tmp_path = _write_json(meta_path, meta)
+
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        os.replace(index_path + ".tmp", index_path)
+        os.replace(documents_tmp_path, documents_path)
+        os.replace(meta_tmp_path, meta_path)
+
+    def set_ef(self, ef_search: int) -> None:
+        self.meta["ef_search"] = ef_search
+        self.index.set_ef(ef_search)
+
+    def search_vectors(self, queries, k: int) -> list[list[tuple[int, float]]]:
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        k = min(k, len(self.ids))
+        if k == 0:
+            return [[] for _ in queries]
+
+        # hnswlib needs ef >= k to return k neighbours.
+        with self._lock:
+            if self.meta["ef_search"] < k:
+                self.index.set_ef(k)
+            labels, distances = self.index.knn_query(queries, k=k)
+            if self.meta["ef_search"] < k:
+                self.index.set_ef(self.meta["ef_search"])
+
+        return [
+            [(int(label), 1.0 - float(distance)) for label, distance in zip(row_labels, row_distances)]
+            for row_labels, row_distances in zip(labels, distances)
+        ]
+
+    def _documents(self, hits) -> list[Document]:
+        docs = []
+        for label, score in hits:
+            # A live update may delete a hit after the search returned it.
+            text = self.texts.get(label)
+            if text is not None:
+                docs.append(Document(page_content=text, metadata={"chunk_id": self.ids.get(label), "score": score}))
+        return docs
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, **kwargs) -> list[Document]:
+        return self._documents(self.search_vectors(embedding, k)[0])
+
+    def similarity_search_by_vectors(self, embeddings, k: int = 4) -> list[list[Document]]:
+        return [self._documents(hits) for hits in self.search_vectors(embeddings, k)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> list[Document]:
+        return self.similarity_search_by_vector(self.embeddings.embed_query(query), k)
+
+    def as_retriever(self, search_type: str = "similarity", search_kwargs: dict | None = None):
+        if search_type != "similarity":
+            raise ValueError(f"HnswVectorStore only supports similarity search, not {search_type}")
+        return SimilarityRetriever(self, (search_kwargs or {}).get("k", 4))
@@ -1,336 +1,76 @@
 import os
-import re
 from datetime import datetime
-from dotenv import load_dotenv
 import streamlit as st
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings, HuggingFaceEndpoint
-
-
-load_dotenv()
-
-HUGGINGFACE_API_TOKEN = os.getenv("HUGGINGFACE_API_TOKEN", "")
-CHROMA_DB_PATH = "./chroma_db"
-
-SAFETY_BLOCKED_KEYWORDS = ["kill", "hurt", "harm", "weapon", "violence", "attack", "injure"]
-
-YOGA_KEYWORDS = [
-    "yoga", "pose", "asana", "pranayama", "meditation", "chakra",
-    "downward dog", "warrior", "lotus", "stretch", "flexibility",
-    "breathing", "mudra", "mantra", "namaste", "hatha", "vinyasa",
-    "yin yoga", "power yoga", "kundalini", "yogi", "asanas",
-    "alignment", "chakras", "benefits", "technique", "posture",
-    "flexibility", "strength", "balance", "relaxation", "stress relief",
-    "pigeon", "child pose", "corpse pose", "mountain pose", "tree pose",
-    "forward fold", "backbend", "hip opener", "sun salutation",
-    "drishti", "ujjayi", "padmasana", "trikonasana", "cobra", "bhujang"
-]
-
-
-def check_safety(query: str) -> tuple[bool, str]:
-    query_lower = query.lower()
-    
-    for keyword in SAFETY_BLOCKED_KEYWORDS:
-        if keyword in query_lower:
-            return False, f"Blocked keyword: {keyword}"
-    
-    harmful_words = ["suicide", "death", "kill"]
-    if any(word in query_lower for word in harmful_words):
-        return False, "Query contains potentially harmful content"
-    
-    return True, "Safe"
-
-
-def is_yoga_question(query: str) -> bool:
-    query_lower = query.lower()
-    
-    if any(keyword in query_lower for keyword in YOGA_KEYWORDS):
-        return True
-    
-    general_yoga_words = ["how", "what", "why", "benefit", "help", "practice", "exercise", "health", "wellness", "fitness", "body", "mind"]
-    if any(word in query_lower for word in general_yoga_words):
-        return True
-    
-    return False
-
-
-YOGA_KNOWLEDGE = """
-YOGA FUNDAMENTALS
-
-What is Yoga?
-Yoga is an ancient practice from India that combines physical poses (asanas), breathing 
-exercises (pranayama), and meditation to improve physical, mental, and spiritual health.
-
-KEY BENEFITS OF YOGA:
-
-Physical Benefits:
-• Increased flexibility and range of motion
-• Stronger muscles and bones
-• Better balance and coordination
-• Improved cardiovascular health
-• Reduced chronic pain and stiffness
-
-Mental & Emotional Benefits:
-• Reduced stress and anxiety
-• Better focus and concentration
-• Improved sleep quality
-• Greater emotional balance
-• Increased self-awareness
-
-Spiritual Benefits:
-• Deeper mindfulness and awareness
-• Inner peace and tranquility
-• Connection to purpose
-• Enhanced spiritual growth
-
-POPULAR YOGA POSES:
-• Mountain Pose (Tadasana) - foundation pose, improves posture
-• Downward Dog (Adho Mukha Svanasana) - strengthens arms, calms mind
-• Warrior I & II (Virabhadrasana) - build strength and confidence
-• Child's Pose (Balasana) - promotes relaxation and calmness
-• Tree Pose (Vrksasana) - improves balance and focus
-• Lotus Pose (Padmasana) - opening pose for meditation
-• Forward Fold (Uttanasana) - stretches hamstrings, calms mind
-
-YOGA PRACTICE TIPS:
-• Practice 3-5 times per week for best results
-• Listen to your body - never force a pose
-• Breathe deeply and steadily (never hold your breath)
-• Warm up before attempting advanced poses
-• Combine poses with meditation and breathing exercises
-"""
-
-@st.cache_resource
-def load_yoga_data():
-    if not os.path.exists("yoga_data.txt"):
-        st.error("yoga_data.txt not found!")
-        st.stop()
-    
-    with open("yoga_data.txt", "r", encoding="utf-8") as f:
-        yoga_text = f.read()
+from corpus import YOGA_DATA_PATH
+from embed_server import EMBED_SOCKET
+from metrics import METRICS, METRICS_PORT, serve_prometheus
+from pipeline import HUGGINGFACE_API_TOKEN, iter_fallback_answer
+from service import InferenceClient, ServiceOverloaded, ServiceRunner, YogaAnswerService
+from vector_index import CHROMA_DB_PATH
+from warmup import WARMUP_FAILED, WarmupState
+from watcher import WATCH_INTERVAL_SECONDS, CorpusWatcher
+
+
+def load_resources(warmup):
+    # Runs on the warm-up thread, so it must not call into Streamlit. The
+    # heavy imports (torch, sentence-transformers, Chroma) happen here
+    # rather than at module import, which keeps the first render fast.
+    if not os.path.exists(YOGA_DATA_PATH):
+        raise FileNotFoundError(f"{YOGA_DATA_PATH} not found!")
+    
+    from cache import AnswerCache
+    from pipeline import load_knowledge_base
+    
+    knowledge = load_knowledge_base(YOGA_DATA_PATH, CHROMA_DB_PATH, stage=warmup.stage)
+    answer_cache = AnswerCache()
+    answer_cache.bind_index(knowledge["index_stats"]["fingerprint"])
+    
+    def create_service():
+        llm_client = InferenceClient() if HUGGINGFACE_API_TOKEN else None
+        return YogaAnswerService(knowledge, llm_client=llm_client, answer_cache=answer_cache)
+    
+    with warmup.stage("answer service"):
+        service = ServiceRunner(create_service)
+    
+    watcher = None
+    if WATCH_INTERVAL_SECONDS > 0 and not EMBED_SOCKET:
+        def publish(updated):
+            service.service.knowledge = updated
+            answer_cache.bind_index(updated["index_stats"]["fingerprint"])
+        
+        watcher = CorpusWatcher(knowledge, publish, YOGA_DATA_PATH, CHROMA_DB_PATH).start()
     
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500,
-        chunk_overlap=50,
-        separators=["\n\n", "\n", ".", " "]
-    )
-    return splitter.split_text(yoga_text)
+    return {"service": service, "index_stats": knowledge["index_stats"], "watcher": watcher}
 
 
 @st.cache_resource
-def create_vector_database(chunks):
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-mpnet-base-v2",
-        model_kwargs={"device": "cpu"}
-    )
-    
-    return Chroma.from_texts(
-        texts=chunks,
-        embedding=embeddings,
-        persist_directory=CHROMA_DB_PATH,
-        collection_name="yoga_knowledge"
-    )
+def get_warmup():
+    return WarmupState(load_resources).start()
 
 
 @st.cache_resource
-def setup_llm():
-    if not HUGGINGFACE_API_TOKEN:
-        return None
-    
-    try:
-        return HuggingFaceEndpoint(
-            repo_id="mistralai/Mistral-Large-Instruct-2411",
-            huggingfacehub_api_token=HUGGINGFACE_API_TOKEN,
-            max_new_tokens=1024,
-            temperature=0.1,
-            top_p=0.92,
-            repetition_penalty=1.1
-        )
-    except:
-        return None
-
-
-def generate_fallback_response(query: str) -> str:
-    query_lower = query.lower()
-    
-    if any(word in query_lower for word in ["benefit", "help", "good", "advantage"]):
-        return """Amazing Benefits of Yoga:
-
-Physical Benefits:
-• Increased flexibility and strength
-• Better balance and coordination
-• Improved cardiovascular health
-• Reduced chronic pain
-• Better posture and alignment
-
-Mental & Emotional:
-• Reduced stress and anxiety
-• Improved focus and concentration
-• Better sleep quality
-• Emotional stability and peace
-• Increased self-awareness
+def start_metrics_server():
+    return serve_prometheus(METRICS_PORT) if METRICS_PORT else None
 
-Spiritual:
-• Deeper mindfulness
-• Inner peace and tranquility
-• Connection to purpose
-• Enhanced spiritual growth
 
-Practice Regularly: 3-5 times per week for best results. Consistency beats intensity!"""
-    
-    elif any(word in query_lower for word in ["pose", "asana"]):
-        if "downward dog" in query_lower:
-            return """Downward Dog (Adho Mukha Svanasana)
-
-What It Does:
-• Strengthens arms, shoulders, legs
-• Stretches hamstrings and calves
-• Improves blood circulation
-• Calms nervous system
-• Reduces stress
-
-How to Do It:
-1. Start on hands and knees
-2. Press palms firmly on ground
-3. Lift hips toward ceiling
-4. Create an inverted V-shape
-5. Head between arms, breathe deeply
-6. Hold 5-10 breaths
-
-Beginner Tips:
-• Bend your knees if needed
-• Don't lock elbows
-• Breathe deeply throughout
-
-Avoid If: You have wrist/shoulder injuries"""
-        else:
-            return """Common Yoga Poses:
-
-Standing: Mountain, Warrior I/II, Triangle - build strength
-Forward Bends: Forward Fold, Seated Fold - stretch & calm
-Backbends: Cobra, Wheel, Bridge - strengthen spine
-Hip Openers: Pigeon, Butterfly - increase flexibility
-Balance: Tree, Eagle - improve focus
-Rest: Child's Pose, Corpse - relax & restore
-
-Which pose interests you?"""
-    
-    elif any(word in query_lower for word in ["beginner", "start", "learn", "new"]):
-        return """Your Yoga Journey Starts Here!
-
-Week 1-2: Foundation
-• Practice 2-3 times per week
-• Learn: Mountain, Child's, Downward Dog
-• Focus on breathing
-• 20-30 minutes per session
+@st.fragment(run_every=2)
+def latency_panel():
+    snapshot = METRICS.snapshot()
+    if not snapshot["latency"]:
+        st.caption("No requests yet.")
+        return
+    st.table([{"stage": stage, **summary} for stage, summary in snapshot["latency"].items()])
+    for counter in snapshot["counters"]:
+        labels = ", ".join(f"{name}={value}" for name, value in counter["labels"].items())
+        st.caption(f"{counter['name']}{f' ({labels})' if labels else ''}: {counter['value']:g}")
 
-Essential Beginner Poses:
-• Mountain Pose - foundation
-• Child's Pose - rest & calm
-• Downward Dog - stretch & strengthen
-• Forward Fold - flexibility
-• Corpse Pose - final relaxation
 
-Important Tips:
-• Never force any pose
-• Listen to your body
-• Breathe deeply & steadily
-• Rest between poses
-• Wear comfortable clothes
-
-What You'll Feel:
-Week 2: Increased flexibility
-Week 3: Strength improvement
-Week 4+: Mental clarity & peace
-
-Consistency is key - start now!"""
-    
-    else:
-        return """Welcome to Your Yoga Assistant!
-
-I'm here to help with:
-• Yoga poses and how to do them
-• Benefits and health improvements
-• Breathing techniques
-• Meditation practices
-• Beginner guidance
-• Safety & precautions
-
-Try Asking:
-• "What is Downward Dog?"
-• "Benefits of yoga?"
-• "How to start yoga?"
-• "Poses for flexibility?"
-• "Breathing techniques?"
-
-Ask a yoga question and let's get started!"""
-
-
-def answer_yoga_question(query: str, vector_db, llm) -> dict:
-    if not is_yoga_question(query):
-        return {
-            "answer": "I'm a yoga specialist! Please ask yoga-related questions.\n\nExamples: What is Downward Dog? Benefits of yoga? How to start?",
-            "sources": []
-        }
-    
-    retriever = vector_db.as_retriever(
-        search_type="similarity",
-        search_kwargs={"k": 3}
-    )
-    
-    pose_match = re.search(r'#?(\d+)|pose\s+#?(\d+)|number\s+#?(\d+)', query.lower())
-    if pose_match:
-        pose_num = pose_match.group(1) or pose_match.group(2) or pose_match.group(3)
-        docs = retriever.invoke(f"YOGA POSE #{pose_num}")
-    else:
-        docs = retriever.invoke(query)
-    
-    if docs and len(docs) > 0:
-        context = docs[0].page_content
-        
-        if llm is not None:
-            try:
-                prompt = f"""You are an expert yoga instructor. Answer the user's question using ONLY the information provided in the context below. Do NOT make up information or reference other poses.
-
-CONTEXT (Use ONLY this information):
-{context}
-
-USER QUESTION: {query}
-
-INSTRUCTIONS:
-1. Answer using ONLY the context above
-2. If the context doesn't have the answer, say "I don't have specific information about that"
-3. Include the pose name (English & Sanskrit if available)
-4. List benefits, precautions, and techniques from the context
-5. Be clear and concise
-6. Do NOT mention other poses unless they are in the context
-
-Answer:"""
-                
-                response = llm.invoke(prompt)
-                
-                if isinstance(response, dict):
-                    for key in ['generated_text', 'text', 'output', 'answer']:
-                        if key in response:
-                            response = response[key]
-                            break
-                
-                answer = str(response).strip()
-                
-                if not answer or len(answer) < 50:
-                    answer = f"Based on the yoga knowledge base:\n\n{context}"
-                elif "i don't know" in answer.lower() or "i cannot" in answer.lower():
-                    answer = f"Based on the yoga knowledge base:\n\n{context}"
-                
-            except Exception as e:
-                answer = f"Based on the yoga knowledge base:\n\n{context}"
-        else:
-            answer = f"Based on the yoga knowledge base:\n\n{context}"
-    else:
-        answer = generate_fallback_response(query)
-    
-    return {"answer": answer, "sources": docs}
+@st.fragment(run_every=1)
+def warmup_status(warmup):
+    if warmup.ready or warmup.status == WARMUP_FAILED:
+        st.rerun()
+    stage = warmup.stage_name or "starting"
+    st.info(f"Loading yoga knowledge in the background ({stage})... Quick answers are available meanwhile.")
 
 
 st.set_page_config(
@@ -414,15 +154,25 @@ def main():
         • Ask about benefits & contraindications
         """)
     
-    try:
-        with st.spinner("Loading yoga knowledge..."):
-            chunks = load_yoga_data()
-            db = create_vector_database(chunks)
-            llm = setup_llm()
-    except Exception as e:
-        st.error(f"Error: {str(e)}")
+    start_metrics_server()
+    with st.sidebar:
+        if st.checkbox("Show live latency", value=False):
+            latency_panel()
+    
+    warmup = get_warmup()
+    if warmup.status == WARMUP_FAILED:
+        st.error(f"Error: {str(warmup.error)}")
         st.stop()
     
+    if warmup.ready:
+        with st.sidebar.expander("Startup timings"):
+            st.json(warmup.snapshot())
+        watcher = warmup.resources["watcher"]
+        if watcher is not None and watcher.last_update:
+            st.sidebar.caption(f"Last reload of {YOGA_DATA_PATH}: {watcher.last_update}")
+    else:
+        warmup_status(warmup)
+    
     st.markdown("---")
     
     question = st.text_input(
@@ -432,18 +182,36 @@ def main():
     )
     
     if question:
-        is_safe, msg = check_safety(question)
+        answer_box = None
+        streamed = ""
+        result = None
         
-        if not is_safe:
-            st.warning(f"Blocked: {msg}")
+        if warmup.ready:
+            events = warmup.resources["service"].events(question)
         else:
+            events = iter_fallback_answer(question)
+        
+        try:
             with st.spinner("Searching yoga knowledge..."):
-                result = answer_yoga_question(question, db, llm)
-                answer = result["answer"]
-                sources = result["sources"]
-            
-            st.markdown('<div class="answer-box">', unsafe_allow_html=True)
-            st.markdown(f"### Answer\n\n{answer}")
+                for event, payload in events:
+                    if event == "blocked":
+                        st.warning(f"Blocked: {payload}")
+                        break
+                    if answer_box is None:
+                        st.markdown('<div class="answer-box">', unsafe_allow_html=True)
+                        answer_box = st.empty()
+                    if event == "token":
+                        streamed += payload
+                        answer_box.markdown(f"### Answer\n\n{streamed}▌")
+                    else:
+                        result = payload
+        except ServiceOverloaded:
+            st.error("The yoga assistant is busy right now. Please try again in a moment.")
+        
+        if result is not None:
+            answer = result["answer"]
+            sources = result["sources"]
+            answer_box.markdown(f"### Answer\n\n{answer}")
             st.markdown('</div>', unsafe_allow_html=True)
     
     st.markdown("---")
@@ -0,0 +1,219 @@
+import argparse
+import json
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from corpus import YOGA_DATA_PATH
+from flat_index import SimilarityRetriever
+from metrics import METRICS, summarize_ms
+from pipeline import (
+    TOPIC_REJECTION_ANSWER,
+    UNROUTED,
+    check_safety,
+    is_yoga_question,
+    iter_yoga_answer,
+    load_knowledge_base,
+    search_query,
+    setup_llm,
+    structured_documents,
+)
+from resilience import LLM_WORKERS, SingleFlight
+from retrieval import DENSE_CANDIDATES
+from vector_index import CHROMA_DB_PATH, similarity_search_batch
+
+
+logger = logging.getLogger(__name__)
+
+def read_questions(path: str) -> list[dict]:
+    # One question per line: a JSON string, or an object with a "question"
+    # field and any other fields (an "id", expected answers) to carry over.
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"question": item}
+            if not isinstance(item, dict) or not isinstance(item.get("question"), str):
+                raise ValueError(f"{path}:{line_number}: expected a string or an object with a \"question\" field")
+            item.setdefault("id", line_number)
+            items.append(item)
+    return items
+
+
+class PrefetchedVectorStore:
+    # Answers similarity_search from hits fetched for the whole batch up
+    # front; anything not prefetched goes to the wrapped store.
+    def __init__(self, vector_db, hits: dict, k: int):
+        self.vector_db = vector_db
+        self.hits = hits
+        self.k = k
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> list:
+        docs = self.hits.get(query)
+        if docs is None or k > self.k:
+            return self.vector_db.similarity_search(query, k=k, **kwargs)
+        return docs[:k]
+
+    def as_retriever(self, search_type: str = "similarity", search_kwargs: dict | None = None):
+        if search_type != "similarity":
+            raise ValueError(f"PrefetchedVectorStore only supports similarity search, not {search_type}")
+        return SimilarityRetriever(self, (search_kwargs or {}).get("k", 4))
+
+
+def prefetch_dense_hits(queries, vector_db, k: int = DENSE_CANDIDATES) -> tuple[dict, dict]:
+    # All queries go through the embedder in one embed_documents call
+    # instead of one forward pass each, then through one multi-query search.
+    texts = list(dict.fromkeys(queries))
+    embeddings = getattr(vector_db, "embeddings", None)
+    if not texts or embeddings is None:
+        return {}, {"embedding_seconds": 0.0, "search_seconds": 0.0}
+
+    started = time.perf_counter()
+    with METRICS.span("query_embedding", batch=len(texts)):
+        vectors = embeddings.embed_documents(texts)
+    embedded = time.perf_counter()
+    with METRICS.span("vector_search", batch=len(texts)):
+        results = similarity_search_batch(vector_db, vectors, k)
+    finished = time.perf_counter()
+    return dict(zip(texts, results)), {
+        "embedding_seconds": round(embedded - started, 3),
+        "search_seconds": round(finished - embedded, 3),
+    }
+
+
+def _sources(docs) -> list[dict]:
+    return [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in docs]
+
+
+def answer_item(item: dict, vector_db, llm, knowledge: dict, flights=None, structured=UNROUTED) -> dict:
+    trace = METRICS.trace("answer")
+    started = time.perf_counter()
+    result = None
+    try:
+        for event, payload in iter_yoga_answer(
+            item["question"], vector_db, llm,
+            pose_table=knowledge.get("pose_table"),
+            facet_index=knowledge.get("facet_index"),
+            lexical_index=knowledge.get("lexical_index"),
+            trace=trace,
+            flights=flights,
+            structured=structured
+        ):
+            if event == "result":
+                result = payload
+    except Exception as e:
+        # One bad question must not cost the answers to all the others.
+        logger.exception("Answering question %r failed", item.get("id"))
+        return {
+            **item,
+            "status": "error",
+            "error": f"{type(e).__name__}: {e}",
+            "timings": {"total_ms": round((time.perf_counter() - started) * 1000, 3)},
+        }
+    timings = {f"{span['stage']}_ms": span["duration_ms"] for span in trace.record["spans"]}
+    timings["total_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return {
+        **item,
+        "status": "answered",
+        "answer": result["answer"],
+        "sources": _sources(result["sources"]),
+        "fallback": trace.record.get("fallback"),
+        "timings": timings,
+    }
+
+
+def run_batch(items: list[dict], knowledge: dict, llm, output_path: str, workers: int = LLM_WORKERS) -> dict:
+    started = time.perf_counter()
+    # One LLM thread per answer worker, so no more calls are sent at once
+    # than the batch was asked for and none wait behind the app's pool.
+    flights = SingleFlight(workers)
+    gated = {}
+    routes = {}
+    searched = []
+    pose_table = knowledge.get("pose_table")
+    for position, item in enumerate(items):
+        gate_started = time.perf_counter()
+        is_safe, reason = check_safety(item["question"])
+        on_topic = is_safe and is_yoga_question(item["question"])
+        gate_ms = round((time.perf_counter() - gate_started) * 1000, 3)
+        if not is_safe:
+            gated[position] = {**item, "status": "blocked", "reason": reason, "timings": {"gate_ms": gate_ms}}
+        elif not on_topic:
+            gated[position] = {
+                **item, "status": "off_topic", "answer": TOPIC_REJECTION_ANSWER, "sources": [],
+                "timings": {"gate_ms": gate_ms},
+            }
+        else:
+            # Routed once here; the answer reuses it instead of routing again.
+            routes[position] = structured_documents(item["question"], pose_table, knowledge.get("facet_index"))
+            if routes[position] is None:
+                searched.append(search_query(item["question"], pose_table))
+    gates_finished = time.perf_counter()
+
+    hits, prefetch_timings = prefetch_dense_hits(searched, knowledge["vector_db"])
+    vector_db = PrefetchedVectorStore(knowledge["vector_db"], hits, DENSE_CANDIDATES)
+    answers_started = time.perf_counter()
+
+    def answer(position: int) -> dict:
+        if position in gated:
+            return gated[position]
+        return answer_item(items[position], vector_db, llm, knowledge, flights, routes[position])
+
+    statuses, fallbacks, latencies = Counter(), Counter(), []
+    with ThreadPoolExecutor(max_workers=workers) as pool, open(output_path, "w", encoding="utf-8") as f:
+        # map keeps the input order while up to `workers` LLM calls run.
+        for row in pool.map(answer, range(len(items))):
+            f.write(json.dumps(row, default=str) + "\n")
+            statuses[row["status"]] += 1
+            if row.get("fallback"):
+                fallbacks[row["fallback"]] += 1
+            if row["status"] == "answered":
+                latencies.append(row["timings"]["total_ms"] / 1000)
+    finished = time.perf_counter()
+
+    total_seconds = finished - started
+    return {
+        "questions": len(items),
+        **{status: statuses[status] for status in ("answered", "blocked", "off_topic", "error")},
+        "fallbacks": dict(fallbacks),
+        "workers": workers,
+        "prefetched_queries": len(hits),
+        "gate_seconds": round(gates_finished - started, 3),
+        **prefetch_timings,
+        "answer_seconds": round(finished - answers_started, 3),
+        "total_seconds": round(total_seconds, 3),
+        "questions_per_second": round(len(items) / total_seconds, 1) if total_seconds else None,
+        "answer_latency": summarize_ms(latencies),
+        "output": output_path,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions offline.")
+    parser.add_argument("questions", help="JSONL file: one question string or {\"question\": ...} object per line")
+    parser.add_argument("--output", default="answers.jsonl", help="JSONL file to write the answers to")
+    parser.add_argument("--data", default=YOGA_DATA_PATH, help="corpus file")
+    parser.add_argument("--persist-dir", default=CHROMA_DB_PATH, help="vector store directory")
+    parser.add_argument("--workers", type=int, default=LLM_WORKERS, help="concurrent LLM calls")
+    parser.add_argument("--no-llm", action="store_true", help="answer from the retrieved context only")
+    args = parser.parse_args()
+
+    items = read_questions(args.questions)
+    started = time.perf_counter()
+    knowledge = load_knowledge_base(args.data, args.persist_dir)
+    llm = None if args.no_llm else setup_llm()
+    load_seconds = time.perf_counter() - started
+
+    summary = run_batch(items, knowledge, llm, args.output, args.workers)
+    summary["load_seconds"] = round(load_seconds, 3)
+    summary["llm"] = llm is not None
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
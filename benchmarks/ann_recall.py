@@ -0,0 +1,135 @@
+import argparse
+import json
+import re
+import time
+
+import numpy as np
+
+from generate_data import RECORDS_PER_BLOCK, format_text_record, iter_block_records
+from metrics import summarize_ms
+
+
+TOKEN_PATTERN = re.compile(r"[a-z]+")
+
+
+def generate_records(count: int, seed: int) -> list[str]:
+    return [
+        format_text_record(record).strip()
+        for block in range(-(-count // RECORDS_PER_BLOCK))
+        for record in iter_block_records(seed, block, count)
+    ]
+
+
+def hashed_vectors(records, dim: int, seed: int) -> np.ndarray:
+    # Bag-of-words projection: every vocabulary word gets a fixed random
+    # direction. Cheap enough for millions of records and keeps the
+    # near-duplicate cluster structure of the generated corpus.
+    vocabulary = {}
+    token_ids, offsets = [], []
+    for record in records:
+        offsets.append(len(token_ids))
+        token_ids.extend(vocabulary.setdefault(token, len(vocabulary)) for token in TOKEN_PATTERN.findall(record.lower()))
+
+    rng = np.random.default_rng(seed)
+    directions = rng.standard_normal((len(vocabulary), dim)).astype(np.float32)
+    vectors = np.add.reduceat(directions[np.asarray(token_ids)], np.asarray(offsets), axis=0)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def model_vectors(records) -> np.ndarray:
+    from embeddings import build_embeddings
+    vectors = np.asarray(build_embeddings().embed_documents(records), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int, block: int = 262144) -> np.ndarray:
+    best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    best_ids = np.zeros((len(queries), k), dtype=np.int64)
+    for start in range(0, len(vectors), block):
+        scores = queries @ vectors[start:start + block].T
+        ids = np.broadcast_to(np.arange(start, start + scores.shape[1]), scores.shape)
+        scores = np.hstack([best_scores, scores])
+        ids = np.hstack([best_ids, ids])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, top, axis=1)
+        best_ids = np.take_along_axis(ids, top, axis=1)
+    return best_ids
+
+
+def bench_size(size: int, args) -> dict:
+    import hnswlib
+
+    records = generate_records(size, args.seed)
+    started = time.perf_counter()
+    vectors = model_vectors(records) if args.vectors == "model" else hashed_vectors(records, args.dim, args.seed)
+    embed_seconds = time.perf_counter() - started
+
+    rng = np.random.default_rng(args.seed + 1)
+    queries = vectors[rng.choice(len(vectors), size=args.queries, replace=False)]
+    queries = queries + rng.normal(scale=args.query_noise, size=queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    exact_latencies = []
+    for query in queries[:min(len(queries), 50)]:
+        started = time.perf_counter()
+        exact_top_k(vectors, query[None, :], args.k)
+        exact_latencies.append(time.perf_counter() - started)
+    truth = exact_top_k(vectors, queries, args.k)
+
+    configs = []
+    for m in args.m:
+        for ef_construction in args.ef_construction:
+            index = hnswlib.Index(space="cosine", dim=vectors.shape[1])
+            index.init_index(max_elements=len(vectors), M=m, ef_construction=ef_construction)
+            started = time.perf_counter()
+            index.add_items(vectors, np.arange(len(vectors)), num_threads=args.threads)
+            build_seconds = time.perf_counter() - started
+
+            for ef_search in args.ef_search:
+                index.set_ef(max(ef_search, args.k))
+                latencies, hits = [], 0
+                for query, expected in zip(queries, truth):
+                    started = time.perf_counter()
+                    labels, _ = index.knn_query(query[None, :], k=args.k, num_threads=1)
+                    latencies.append(time.perf_counter() - started)
+                    hits += len(set(labels[0].tolist()) & set(expected.tolist()))
+                configs.append({
+                    "m": m,
+                    "ef_construction": ef_construction,
+                    "ef_search": ef_search,
+                    "build_seconds": round(build_seconds, 2),
+                    "recall_at_k": round(hits / (len(queries) * args.k), 4),
+                    "latency": summarize_ms(latencies),
+                })
+
+    return {
+        "records": len(records),
+        "dim": int(vectors.shape[1]),
+        "embed_seconds": round(embed_seconds, 2),
+        "exact_latency": summarize_ms(exact_latencies),
+        "hnsw": configs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k vs latency of HNSW against exact search.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--vectors", choices=["hashed", "model"], default="hashed",
+                        help="hashed bag-of-words vectors scale to millions; model uses the real embedder")
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--query-noise", type=float, default=0.02)
+    parser.add_argument("--m", type=int, nargs="+", default=[16, 32])
+    parser.add_argument("--ef-construction", type=int, nargs="+", default=[200])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128, 256])
+    parser.add_argument("--threads", type=int, default=-1)
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+
+    results = [bench_size(size, args) for size in args.sizes]
+    print(json.dumps({"k": args.k, "vectors": args.vectors, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
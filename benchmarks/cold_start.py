@@ -0,0 +1,83 @@
+import argparse
+import json
+import subprocess
+import sys
+
+from metrics import summarize_ms
+
+
+# What app.py imports before the first render, next to the modules the
+# warm-up thread now loads in the background.
+IMPORT_TARGETS = {
+    "first_paint": "corpus, pipeline, service, vector_index, warmup",
+    "streamlit": "streamlit",
+    "langchain_huggingface": "langchain_huggingface",
+    "chroma": "langchain_community.vectorstores",
+    "sentence_transformers": "sentence_transformers",
+}
+
+IMPORT_PROBE = """
+import time
+started = time.perf_counter()
+import {modules}
+print(time.perf_counter() - started)
+"""
+
+FIRST_ANSWER_PROBE = """
+import time
+started = time.perf_counter()
+from pipeline import iter_fallback_answer
+list(iter_fallback_answer("What are the benefits of Downward Dog?"))
+print(time.perf_counter() - started)
+"""
+
+WARMUP_PROBE = """
+import json
+from pipeline import load_knowledge_base
+from warmup import WarmupState
+state = WarmupState(lambda warmup: load_knowledge_base({data!r}, {persist_dir!r}, stage=warmup.stage)).start()
+state.wait()
+print(json.dumps(state.snapshot()))
+"""
+
+
+def run_probe(code: str) -> str:
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    return completed.stdout.strip().splitlines()[-1]
+
+
+def time_probe(code: str, repeats: int) -> dict:
+    try:
+        return summarize_ms([float(run_probe(code)) for _ in range(repeats)])
+    except RuntimeError as e:
+        return {"error": str(e)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import and warm-up cost of a fresh app process.")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--warmup", action="store_true", help="also time a full background warm-up")
+    parser.add_argument("--data", default="yoga_data.txt")
+    parser.add_argument("--persist-dir", default="./chroma_db")
+    args = parser.parse_args()
+
+    results = {
+        "imports": {
+            name: time_probe(IMPORT_PROBE.format(modules=modules), args.repeats)
+            for name, modules in IMPORT_TARGETS.items()
+        },
+        "first_fallback_answer": time_probe(FIRST_ANSWER_PROBE, args.repeats),
+    }
+    if args.warmup:
+        try:
+            results["warmup"] = json.loads(run_probe(WARMUP_PROBE.format(data=args.data, persist_dir=args.persist_dir)))
+        except RuntimeError as e:
+            results["warmup"] = {"error": str(e)}
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
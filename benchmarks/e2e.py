@@ -0,0 +1,246 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from benchmarks.load_test import DEFAULT_QUESTIONS
+from corpus import INGEST_MODE, INGEST_MODES
+from embeddings import EMBEDDING_BACKEND, EMBEDDING_BACKENDS, build_embeddings, embedding_identity
+from generate_data import POSES, save_yoga_data
+from metrics import peak_rss_mb, summarize_ms
+from vector_index import VECTOR_BACKEND, WRITE_BATCH_SIZE
+
+
+class PrecomputedEmbeddings:
+    # Serves the vectors from the embedding stage to the index build so the
+    # two stages are timed separately; queries still go to the embedder.
+    def __init__(self, embeddings, texts, vectors):
+        self.embeddings = embeddings
+        self.vectors = dict(zip(texts, vectors))
+
+    def embed_documents(self, texts):
+        return [self.vectors[text] if text in self.vectors else self.embeddings.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+
+class StageRecorder:
+    def __init__(self, trace_memory: bool):
+        self.trace_memory = trace_memory
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        record = {}
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        yield record
+        if self.trace_memory:
+            record["traced_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        rss = peak_rss_mb()
+        record["peak_rss_mb"] = round(rss, 1) if rss is not None else None
+        self.stages[name] = record
+
+
+def timed(fn, repeats: int):
+    samples, result = [], None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return result, samples
+
+
+def build_queries(records: int, count: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    queries = list(DEFAULT_QUESTIONS)
+    while len(queries) < count:
+        kind = rng.randrange(3)
+        if kind == 0:
+            queries.append(f"Tell me about pose #{rng.randint(1, records)}")
+        elif kind == 1:
+            queries.append(f"What are the benefits of {rng.choice(POSES)}?")
+        else:
+            queries.append(f"How do I safely practice {rng.choice(POSES).split(' (')[0]}?")
+    return queries[:count]
+
+
+def run_size(records: int, workdir: str, args) -> dict:
+    from context import build_context, count_tokens
+    from corpus import build_canonical_documents, build_splitter, iter_chunk_spans, load_pose_table, split_record_chunks
+    from facets import FacetIndex
+    from lexical import load_or_build_lexical_index
+    from pipeline import build_prompt, retrieve_documents, stream_yoga_answer
+    from stub_endpoint import StubLLM
+    from vector_index import open_vector_store
+
+    if args.trace_memory:
+        tracemalloc.start()
+    recorder = StageRecorder(args.trace_memory)
+    data_path = os.path.join(workdir, "yoga_data.txt")
+    persist_directory = os.path.join(workdir, "index")
+
+    with recorder.stage("generate") as record:
+        _, samples = timed(lambda: save_yoga_data(data_path, records, args.seed, args.workers), 1)
+        record["latency"] = summarize_ms(samples)
+        record["file_mb"] = round(os.path.getsize(data_path) / (1024 * 1024), 2)
+
+    # Runs before the whole file is read into memory so its peak RSS shows
+    # what the streaming chunker needs on its own.
+    if args.ingest_mode == "records":
+        with recorder.stage("streaming_chunking") as record:
+            count, samples = timed(lambda: sum(1 for _ in iter_chunk_spans(data_path)), args.repeats)
+            record["latency"] = summarize_ms(samples)
+            record["chunks"] = count
+            record["mb_per_second"] = round(os.path.getsize(data_path) / (1024 * 1024) / min(samples), 1)
+
+    def read_file():
+        with open(data_path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    with recorder.stage("file_read") as record:
+        text, samples = timed(read_file, args.repeats)
+        record["latency"] = summarize_ms(samples)
+
+    with recorder.stage("chunking") as record:
+        if args.ingest_mode == "canonical":
+            split = build_canonical_documents
+        else:
+            splitter = build_splitter()
+            split = lambda text: list(split_record_chunks(text, splitter))
+        chunks, samples = timed(lambda: split(text), args.repeats)
+        record["latency"] = summarize_ms(samples)
+        record["chunks"] = len(chunks)
+
+    embeddings = build_embeddings(args.embedder)
+    texts = list(dict.fromkeys(chunks))
+    with recorder.stage("embedding") as record:
+        vectors, samples = [], []
+        for start in range(0, len(texts), WRITE_BATCH_SIZE):
+            started = time.perf_counter()
+            vectors.extend(embeddings.embed_documents(texts[start:start + WRITE_BATCH_SIZE]))
+            samples.append(time.perf_counter() - started)
+        record["batch_latency"] = summarize_ms(samples)
+        record["chunks_per_second"] = round(len(texts) / sum(samples), 1) if samples else None
+
+    with recorder.stage("index_build") as record:
+        started = time.perf_counter()
+        vector_db, index_stats = open_vector_store(
+            chunks, PrecomputedEmbeddings(embeddings, texts, vectors), persist_directory, backend=args.backend,
+            model_name=embedding_identity(args.embedder)
+        )
+        record["vector_seconds"] = round(time.perf_counter() - started, 3)
+        started = time.perf_counter()
+        lexical_index = load_or_build_lexical_index(chunks, persist_directory)
+        record["lexical_seconds"] = round(time.perf_counter() - started, 3)
+        started = time.perf_counter()
+        pose_table = load_pose_table(data_path)
+        facet_index = FacetIndex(pose_table.items())
+        record["pose_index_seconds"] = round(time.perf_counter() - started, 3)
+        record["vectors"] = index_stats["total"]
+    del text, chunks, texts, vectors
+
+    queries = build_queries(records, args.queries, args.seed)
+    knowledge = {"pose_table": pose_table, "facet_index": facet_index, "lexical_index": lexical_index}
+
+    with recorder.stage("retrieval") as record:
+        retrieved, samples = [], []
+        for query in queries:
+            started = time.perf_counter()
+            retrieved.append(retrieve_documents(query, vector_db, **knowledge))
+            samples.append(time.perf_counter() - started)
+        record["latency"] = summarize_ms(samples)
+
+    with recorder.stage("prompt") as record:
+        samples, tokens = [], []
+        for query, docs in zip(queries, retrieved):
+            if not docs:
+                continue
+            started = time.perf_counter()
+            prompt = build_prompt(build_context(docs, pose_table, facet_index=facet_index), query)
+            samples.append(time.perf_counter() - started)
+            tokens.append(count_tokens(prompt))
+        record["latency"] = summarize_ms(samples)
+        record["prompt_tokens_p50"] = sorted(tokens)[len(tokens) // 2] if tokens else None
+        record["prompt_tokens_max"] = max(tokens) if tokens else None
+
+    llm = StubLLM()
+    # Streamed, as the app answers, so the time to the first token (what a
+    # user waits before seeing anything) is reported next to the full answer.
+    with recorder.stage("answer") as record:
+        samples, first_token = [], []
+        for query in queries:
+            started = time.perf_counter()
+            first = None
+            for event, _ in stream_yoga_answer(query, vector_db, llm, **knowledge):
+                if event == "token" and first is None:
+                    first = time.perf_counter() - started
+            samples.append(time.perf_counter() - started)
+            if first is not None:
+                first_token.append(first)
+        record["latency"] = summarize_ms(samples)
+        record["first_token_latency"] = summarize_ms(first_token)
+
+    return {"records": records, "stages": recorder.stages}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stage-by-stage ingest and query benchmark across corpus sizes.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--embedder", choices=EMBEDDING_BACKENDS, default=EMBEDDING_BACKEND,
+                        help="hashing skips the model so large corpora finish quickly")
+    parser.add_argument("--backend", default=VECTOR_BACKEND, help="chroma, flat or hnsw")
+    parser.add_argument("--ingest-mode", choices=INGEST_MODES, default=INGEST_MODE)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=5, help="repetitions of the file read and chunking stages")
+    parser.add_argument("--workers", type=int, default=1, help="corpus generation workers")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--trace-memory", action="store_true", help="also report tracemalloc peaks (slower)")
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    parser.add_argument("--run", nargs=2, metavar=("RECORDS", "WORKDIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_size(int(args.run[0]), args.run[1], args)))
+        return
+
+    results = []
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            # A fresh process per size keeps peak RSS and warm caches from
+            # leaking between corpus sizes.
+            command = [
+                sys.executable, "-m", "benchmarks.e2e",
+                "--embedder", args.embedder, "--backend", args.backend, "--ingest-mode", args.ingest_mode,
+                "--queries", str(args.queries), "--repeats", str(args.repeats),
+                "--workers", str(args.workers), "--seed", str(args.seed),
+                "--run", str(size), workdir,
+            ]
+            if args.trace_memory:
+                command.append("--trace-memory")
+            output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+    report = json.dumps({
+        "embedder": args.embedder,
+        "backend": args.backend,
+        "ingest_mode": args.ingest_mode,
+        "queries": args.queries,
+        "seed": args.seed,
+        "results": results,
+    }, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from generate_data import BENEFITS, POSES
+from metrics import peak_rss_mb, summarize_ms
+
+
+def build_queries(count: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    return [f"{rng.choice(POSES)} for someone who wants {rng.choice(BENEFITS)} ({i})" for i in range(count)]
+
+
+def run_client(mode: str, address: str, queries: int, threads: int, seed: int) -> dict:
+    if mode == "shared":
+        from embed_server import EmbedClient, RemoteEmbeddings
+        embeddings = RemoteEmbeddings(EmbedClient(address))
+    else:
+        from embeddings import build_embeddings
+        embeddings = build_embeddings()
+
+    latencies = []
+
+    def embed(query):
+        started = time.perf_counter()
+        embeddings.embed_query(query)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(embed, build_queries(queries, seed)))
+    return {"seconds": time.perf_counter() - started, "latencies": latencies, "peak_rss_mb": peak_rss_mb()}
+
+
+def run_workers(mode: str, address: str, args) -> dict:
+    command = [
+        sys.executable, "-m", "benchmarks.embed_server_bench",
+        "--queries", str(args.queries), "--threads", str(args.threads),
+    ]
+    started = time.perf_counter()
+    clients = [
+        subprocess.Popen(command + ["--seed", str(args.seed + i), "--client", mode, address],
+                         stdout=subprocess.PIPE, text=True)
+        for i in range(args.workers)
+    ]
+    reports = [json.loads(client.communicate()[0].strip().splitlines()[-1]) for client in clients]
+    elapsed = time.perf_counter() - started
+
+    total = args.workers * args.queries
+    latencies = [latency for report in reports for latency in report["latencies"]]
+    return {
+        "mode": mode,
+        "workers": args.workers,
+        "queries": total,
+        "throughput_qps": round(total / elapsed, 1),
+        "latency": summarize_ms(latencies),
+        "worker_rss_mb": round(sum(report["peak_rss_mb"] or 0 for report in reports), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-worker models against one shared, micro-batching embedding server.")
+    parser.add_argument("--workers", type=int, default=4, help="simulated app worker processes")
+    parser.add_argument("--threads", type=int, default=8, help="concurrent queries per worker")
+    parser.add_argument("--queries", type=int, default=200, help="queries per worker")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--client", nargs=2, metavar=("MODE", "ADDRESS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.client:
+        report = run_client(args.client[0], args.client[1], args.queries, args.threads, args.seed)
+        print(json.dumps(report))
+        return
+
+    results = [run_workers("local", "", args)]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        address = os.path.join(workdir, "embed.sock")
+        server = subprocess.Popen(
+            [sys.executable, "embed_server.py", "--socket", address, "--embed-only", "--max-batch", str(args.max_batch)],
+            stdout=subprocess.DEVNULL
+        )
+        try:
+            while not os.path.exists(address):
+                if server.poll() is not None:
+                    raise RuntimeError("embedding server exited during startup")
+                time.sleep(0.1)
+            shared = run_workers("shared", address, args)
+
+            from embed_server import EmbedClient
+            stats = EmbedClient(address).call("stats")
+            shared["server_rss_mb"] = round(stats["peak_rss_mb"], 1) if stats["peak_rss_mb"] else None
+            shared["mean_batch"] = stats["mean_batch"]
+            results.append(shared)
+        finally:
+            server.terminate()
+            server.wait()
+
+    results[0]["total_rss_mb"] = results[0]["worker_rss_mb"]
+    results[1]["total_rss_mb"] = round(results[1]["worker_rss_mb"] + (results[1]["server_rss_mb"] or 0), 1)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.e2e import build_queries
+from corpus import YOGA_DATA_PATH, iter_chunks
+from embeddings import EMBEDDING_BACKENDS, ONNX_THREADS, build_embeddings
+from metrics import peak_rss_mb, summarize_ms
+from vector_index import WRITE_BATCH_SIZE
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def measure(backend: str, workdir: str) -> dict:
+    with open(os.path.join(workdir, "texts.json"), "r", encoding="utf-8") as f:
+        payload = json.load(f)
+
+    started = time.perf_counter()
+    embeddings = build_embeddings(backend)
+    load_seconds = time.perf_counter() - started
+
+    vectors, samples = [], []
+    texts = payload["texts"]
+    for start in range(0, len(texts), WRITE_BATCH_SIZE):
+        started = time.perf_counter()
+        vectors.extend(embeddings.embed_documents(texts[start:start + WRITE_BATCH_SIZE]))
+        samples.append(time.perf_counter() - started)
+
+    queries, latencies = [], []
+    for query in payload["queries"]:
+        started = time.perf_counter()
+        queries.append(embeddings.embed_query(query))
+        latencies.append(time.perf_counter() - started)
+
+    np.save(os.path.join(workdir, f"{backend}-docs.npy"), np.asarray(vectors, dtype=np.float32))
+    np.save(os.path.join(workdir, f"{backend}-queries.npy"), np.asarray(queries, dtype=np.float32))
+    rss = peak_rss_mb()
+    return {
+        "backend": backend,
+        "dim": len(vectors[0]) if vectors else None,
+        "load_seconds": round(load_seconds, 3),
+        "docs_per_second": round(len(texts) / sum(samples), 1) if samples else None,
+        "query": summarize_ms(latencies),
+        "peak_rss_mb": round(rss, 1) if rss is not None else None,
+    }
+
+
+def top_k(docs: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = _normalize(queries) @ _normalize(docs).T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def agreement(workdir: str, backend: str, reference: str, k: int) -> dict:
+    # Exact cosine search on both sides, so the only difference measured is
+    # the embedder itself rather than any index approximation.
+    def load(name, kind):
+        return np.load(os.path.join(workdir, f"{name}-{kind}.npy"))
+
+    docs, reference_docs = load(backend, "docs"), load(reference, "docs")
+    expected = top_k(reference_docs, load(reference, "queries"), k)
+    found = top_k(docs, load(backend, "queries"), k)
+    overlap = [len(set(a) & set(b)) / k for a, b in zip(expected, found)]
+    result = {
+        "reference": reference,
+        f"overlap_at_{k}": round(float(np.mean(overlap)), 4),
+        "top1_agreement": round(float(np.mean(expected[:, 0] == found[:, 0])), 4),
+    }
+    if docs.shape == reference_docs.shape:
+        cosine = np.sum(_normalize(docs) * _normalize(reference_docs), axis=1)
+        result["mean_cosine"] = round(float(cosine.mean()), 4)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare embedding backends on throughput and retrieval agreement.")
+    parser.add_argument("--data", default=YOGA_DATA_PATH)
+    parser.add_argument("--backends", nargs="+", choices=EMBEDDING_BACKENDS, default=list(EMBEDDING_BACKENDS))
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--onnx-threads", type=int, default=ONNX_THREADS, help="intra-op threads, 0 lets ONNX Runtime decide")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--measure", nargs=2, metavar=("BACKEND", "WORKDIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure[0], args.measure[1])))
+        return
+
+    texts = list(dict.fromkeys(iter_chunks(args.data)))
+    queries = build_queries(len(texts), args.queries, args.seed)
+    env = {**os.environ, "YOGA_ONNX_THREADS": str(args.onnx_threads)}
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        with open(os.path.join(workdir, "texts.json"), "w", encoding="utf-8") as f:
+            json.dump({"texts": texts, "queries": queries}, f)
+
+        for backend in args.backends:
+            # A fresh process per backend keeps load time and peak RSS honest.
+            completed = subprocess.run(
+                [sys.executable, "-m", "benchmarks.embedding_backends", "--measure", backend, workdir],
+                capture_output=True, text=True, env=env
+            )
+            if completed.returncode != 0:
+                lines = completed.stderr.strip().splitlines()
+                results.append({"backend": backend, "error": lines[-1] if lines else "failed"})
+                continue
+            results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+        measured = [result["backend"] for result in results if "error" not in result]
+        if measured:
+            reference = "huggingface" if "huggingface" in measured else measured[0]
+            for result in results:
+                if "error" not in result and result["backend"] != reference:
+                    result["agreement"] = agreement(workdir, result["backend"], reference, args.k)
+
+    print(json.dumps({"chunks": len(texts), "queries": len(queries), "k": args.k, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
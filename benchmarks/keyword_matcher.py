@@ -0,0 +1,68 @@
+import argparse
+import json
+import random
+import string
+import time
+
+from keywords import KeywordMatcher
+
+
+QUERIES = [
+    "What are the benefits of Downward Dog for lower back pain?",
+    "How do I build the skill to hold crow pose for a minute?",
+    "Which beginner poses are safe with wrist issues and help me relax after work?",
+    "Tell me about pranayama breathing for stress relief before sleep",
+]
+
+
+def synthetic_terms(count: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    terms = []
+    for _ in range(count):
+        words = rng.randint(1, 3)
+        terms.append(" ".join(
+            "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10)))
+            for _ in range(words)
+        ))
+    return terms
+
+
+def substring_scan(terms, query: str) -> bool:
+    query_lower = query.lower()
+    return any(term in query_lower for term in terms)
+
+
+def time_per_query(fn, repeats: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for query in QUERIES:
+            fn(query)
+    return (time.perf_counter() - started) / (repeats * len(QUERIES)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-query cost of the keyword gates as the term list grows.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000, 50000])
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        terms = synthetic_terms(size, args.seed)
+        started = time.perf_counter()
+        matcher = KeywordMatcher(terms)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        results.append({
+            "terms": size,
+            "matcher_build_ms": round(build_ms, 2),
+            "matcher_us_per_query": round(time_per_query(matcher.find, args.repeats), 2),
+            "substring_us_per_query": round(time_per_query(lambda q: substring_scan(terms, q), args.repeats), 2),
+        })
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+from metrics import METRICS, summarize_ms
+from pipeline import load_knowledge_base
+from service import InferenceClient, ServiceOverloaded, YogaAnswerService
+from stub_endpoint import STUB_HOST, STUB_PORT, serve
+
+
+DEFAULT_QUESTIONS = [
+    "What are the benefits of Downward Dog?",
+    "Tell me about pose #42",
+    "beginner poses that reduce lower back pain and are safe with wrist issues",
+    "Parivrtta Trikonasana precautions",
+    "Which poses open the heart chakra?",
+    "How do I start practicing yoga?",
+]
+
+
+async def run_load(service, questions, total: int, concurrency: int) -> dict:
+    latencies = []
+    outcomes = {"ok": 0, "overloaded": 0, "error": 0}
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                await service.answer(questions[i % len(questions)])
+                outcomes["ok"] += 1
+                latencies.append(time.perf_counter() - started)
+            except ServiceOverloaded:
+                outcomes["overloaded"] += 1
+            except Exception:
+                outcomes["error"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(outcomes["ok"] / elapsed, 2) if elapsed else None,
+        **outcomes,
+        "latency": summarize_ms(latencies),
+    }
+
+
+async def main_async(args, knowledge) -> dict:
+    client = InferenceClient(endpoint_url=args.endpoint, token="", max_connections=args.service_concurrency)
+    service = YogaAnswerService(
+        knowledge,
+        llm_client=client,
+        max_concurrency=args.service_concurrency,
+        max_pending=args.max_pending
+    )
+    try:
+        return await run_load(service, args.questions, args.requests, args.concurrency)
+    finally:
+        await service.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the answer service against an inference endpoint.")
+    parser.add_argument("--endpoint", default=None, help="endpoint URL (default: start a local stub)")
+    parser.add_argument("--stub-latency", type=float, default=0.2, help="latency of the local stub in seconds")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent callers")
+    parser.add_argument("--service-concurrency", type=int, default=8, help="concurrent endpoint calls")
+    parser.add_argument("--max-pending", type=int, default=64)
+    parser.add_argument("--questions", default=None, help="file with one question per line")
+    parser.add_argument("--metrics-out", default=None, help="write the per-stage metrics here in Prometheus text format")
+    args = parser.parse_args()
+
+    if args.questions:
+        with open(args.questions, "r", encoding="utf-8") as f:
+            args.questions = [line.strip() for line in f if line.strip()]
+    else:
+        args.questions = DEFAULT_QUESTIONS
+
+    stub = None
+    if args.endpoint is None:
+        stub = serve(STUB_HOST, STUB_PORT, latency=args.stub_latency)
+        threading.Thread(target=stub.serve_forever, daemon=True).start()
+        args.endpoint = f"http://{STUB_HOST}:{STUB_PORT}"
+
+    try:
+        knowledge = load_knowledge_base()
+        result = asyncio.run(main_async(args, knowledge))
+        result["stages"] = METRICS.latency_summary()
+        print(json.dumps(result, indent=2))
+        if args.metrics_out:
+            with open(args.metrics_out, "w", encoding="utf-8") as f:
+                f.write(METRICS.render_prometheus())
+    finally:
+        if stub is not None:
+            stub.shutdown()
+            stub.server_close()
+
+
+if __name__ == "__main__":
+    main()
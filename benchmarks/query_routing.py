@@ -0,0 +1,71 @@
+import argparse
+import json
+import sys
+
+from corpus import YOGA_DATA_PATH, load_pose_table
+from facets import FacetIndex
+from pipeline import is_yoga_question, parse_pose_number, structured_documents
+
+
+# (query, pose number it names or None, expected route). Numbers that are
+# not an explicit "#N", "pose N" or "number N" reference must leave the
+# query to search, a question about one named pose is searched rather
+# than answered with every record sharing a facet value, and Sanskrit
+# names missing from POSES still pass the topic gate.
+CASES = [
+    ("Tell me about pose #12", 12, "pose_number"),
+    ("What is yoga pose 7?", 7, "pose_number"),
+    ("Explain pose number 3", 3, "pose_number"),
+    ("Yoga #45", 45, "pose_number"),
+    ("Show me yoga record number 20", 20, "pose_number"),
+    ("Is yoga good for 50 year olds?", None, "search"),
+    ("Can yoga help me sleep in 10 minutes a day?", None, "search"),
+    ("What are 3 poses for lower back pain?", None, "facets"),
+    ("Best poses for a 30 minute morning routine", None, "search"),
+    ("How many breaths should I hold downward dog for, 5 or 10?", None, "search"),
+    ("Which beginner poses are safe with wrist issues?", None, "facets"),
+    ("Is Crow Pose suitable for beginners?", None, "search"),
+    ("How do I do Downward Dog as a beginner?", None, "search"),
+    ("Is Warrior II advanced?", None, "search"),
+    ("Tell me about Bakasana technique, I have wrist issues", None, "search"),
+    ("Utkatasana details", None, "search"),
+    ("Ustrasana", None, "search"),
+    ("Pincha Mayurasana", None, "search"),
+    ("Suryanamaskar", None, "search"),
+    ("pranayam", None, "search"),
+    ("Tell me a joke about cats", None, "off_topic"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check which queries are rejected as off topic or routed to a pose-number lookup, a facet filter or search.")
+    parser.add_argument("--data", default=YOGA_DATA_PATH, help="corpus file")
+    args = parser.parse_args()
+
+    pose_table = load_pose_table(args.data)
+    facet_index = FacetIndex(pose_table.items())
+
+    results, failures = [], 0
+    for query, expected_number, expected_route in CASES:
+        pose_number = parse_pose_number(query)
+        structured = structured_documents(query, pose_table, facet_index)
+        if not is_yoga_question(query):
+            route = "off_topic"
+        else:
+            route = structured[0] if structured else "search"
+        ok = pose_number == expected_number and route == expected_route
+        failures += not ok
+        results.append({
+            "query": query,
+            "pose_number": pose_number,
+            "route": route,
+            "expected_route": expected_route,
+            "ok": ok,
+        })
+
+    print(json.dumps(results, indent=2))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from corpus import YOGA_DATA_PATH, load_pose_table
+from metrics import METRICS, summarize_ms
+from pipeline import answer_yoga_question
+from resilience import CircuitBreaker, SingleFlight
+from stub_endpoint import StubLLM
+
+
+def run_scenario(name: str, llm, knowledge: dict, questions, concurrency: int, breaker, flights) -> dict:
+    # Each scenario gets its own breaker and flight group, so it starts from
+    # a closed breaker with nothing in flight.
+    METRICS.reset()
+
+    def ask(question):
+        started = time.perf_counter()
+        answer_yoga_question(question, None, llm, breaker=breaker, flights=flights, **knowledge)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(ask, questions))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "scenario": name,
+        "requests": len(questions),
+        "concurrency": concurrency,
+        "upstream_calls": llm.calls,
+        "elapsed_seconds": round(elapsed, 3),
+        "latency": summarize_ms(latencies),
+        "counters": {
+            counter["name"] + "{" + ",".join(f"{k}={v}" for k, v in counter["labels"].items()) + "}": counter["value"]
+            for counter in METRICS.snapshot()["counters"]
+            if counter["name"] in ("fallback_total", "llm_calls_total", "circuit_breaker_transitions_total")
+        },
+        "breaker": breaker.snapshot(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exercise LLM deadlines, the circuit breaker and request coalescing against a stub endpoint.")
+    parser.add_argument("--data", default=YOGA_DATA_PATH)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.5, help="stub latency in seconds")
+    parser.add_argument("--timeout", type=float, default=0.2, help="per-call deadline for the slow-endpoint scenario")
+    parser.add_argument("--failures", type=int, default=5, help="consecutive failures that open the breaker")
+    args = parser.parse_args()
+
+    # Pose-number questions skip the vector store, so only the LLM path is
+    # measured and no embedding model is needed.
+    pose_table = load_pose_table(args.data)
+    knowledge = {"pose_table": pose_table}
+    poses = sorted(pose_table)
+    distinct = [f"Tell me about pose #{poses[i % len(poses)]}" for i in range(args.requests)]
+    identical = [distinct[0]] * args.requests
+
+    def breaker():
+        return CircuitBreaker(failure_threshold=args.failures)
+
+    results = [
+        run_scenario(
+            "identical_questions", StubLLM(latency=args.latency), knowledge, identical,
+            args.concurrency, breaker(), SingleFlight(args.concurrency, timeout=args.latency * 10)
+        ),
+        run_scenario(
+            "slow_endpoint", StubLLM(latency=args.latency), knowledge, distinct,
+            args.concurrency, breaker(), SingleFlight(args.concurrency, timeout=args.timeout)
+        ),
+        run_scenario(
+            "failing_endpoint", StubLLM(latency=args.latency, failure_rate=1.0), knowledge, distinct,
+            args.concurrency, breaker(), SingleFlight(args.concurrency, timeout=args.latency * 10)
+        ),
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
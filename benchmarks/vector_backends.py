@@ -0,0 +1,128 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from corpus import YOGA_DATA_PATH, iter_chunks
+from metrics import peak_rss_mb, summarize_ms
+
+
+BACKENDS = ["chroma", "flat-float32", "flat-float16", "flat-int8"]
+
+
+class PrecomputedEmbeddings:
+    def __init__(self, texts, vectors):
+        self.vectors = dict(zip(texts, vectors))
+
+    def embed_documents(self, texts):
+        return [self.vectors[text] for text in texts]
+
+    def embed_query(self, text):
+        return self.vectors[text]
+
+
+def directory_size_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total / (1024 * 1024)
+
+
+def build(backend: str, workdir: str, texts, vectors) -> float:
+    started = time.perf_counter()
+    if backend == "chroma":
+        from langchain_community.vectorstores import Chroma
+        db = Chroma(collection_name="bench", embedding_function=None, persist_directory=os.path.join(workdir, backend))
+        for start in range(0, len(texts), 1000):
+            db._collection.upsert(
+                ids=[str(i) for i in range(start, min(start + 1000, len(texts)))],
+                embeddings=vectors[start:start + 1000].tolist(),
+                documents=texts[start:start + 1000]
+            )
+    else:
+        from flat_index import FlatVectorStore
+        FlatVectorStore.sync(
+            texts,
+            PrecomputedEmbeddings(texts, vectors),
+            os.path.join(workdir, backend),
+            dtype=backend.split("-", 1)[1]
+        )
+    return time.perf_counter() - started
+
+
+def measure(backend: str, workdir: str, k: int) -> dict:
+    queries = np.load(os.path.join(workdir, "queries.npy"))
+    baseline_rss = peak_rss_mb()
+
+    started = time.perf_counter()
+    if backend == "chroma":
+        from langchain_community.vectorstores import Chroma
+        store = Chroma(collection_name="bench", embedding_function=None, persist_directory=os.path.join(workdir, backend))
+        store._collection.count()
+    else:
+        from flat_index import FlatVectorStore
+        store = FlatVectorStore.open(os.path.join(workdir, backend), None)
+    open_seconds = time.perf_counter() - started
+
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        store.similarity_search_by_vector(query.tolist(), k=k)
+        latencies.append(time.perf_counter() - started)
+
+    rss = peak_rss_mb()
+    return {
+        "backend": backend,
+        "open_ms": round(open_seconds * 1000, 3),
+        "query": summarize_ms(latencies),
+        "disk_mb": round(directory_size_mb(os.path.join(workdir, backend)), 2),
+        "rss_growth_mb": round(rss - baseline_rss, 1) if rss is not None else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Chroma against the flat NumPy index.")
+    parser.add_argument("--data", default=YOGA_DATA_PATH)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--measure", nargs=2, metavar=("BACKEND", "WORKDIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure[0], args.measure[1], args.k)))
+        return
+
+    from embeddings import build_embeddings
+
+    texts = list(dict.fromkeys(iter_chunks(args.data)))
+    embeddings = build_embeddings()
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(texts), size=min(args.queries, len(texts)), replace=False)
+    queries = np.asarray(embeddings.embed_documents([texts[i][:120] for i in sample]), dtype=np.float32)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        np.save(os.path.join(workdir, "queries.npy"), queries)
+        for backend in BACKENDS:
+            build_seconds = build(backend, workdir, texts, vectors)
+            # Each backend is opened in a fresh process so open time and
+            # memory are not flattered by state left over from the build.
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.vector_backends", "--k", str(args.k), "--measure", backend, workdir],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            result["build_seconds"] = round(build_seconds, 3)
+            results.append(result)
+
+    print(json.dumps({"chunks": len(texts), "dim": int(vectors.shape[1]), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import METRICS
+
+
+QUERY_EMBEDDING_CACHE_SIZE = 1024
+ANSWER_CACHE_SIZE = 256
+ANSWER_CACHE_TTL_SECONDS = 3600
+
+_MISSING = object()
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(re.sub(r"[^\w\s#]", " ", query.lower()).split())
+
+
+class LRUCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TTLCache(LRUCache):
+    def __init__(self, maxsize: int, ttl: float, clock=time.monotonic):
+        super().__init__(maxsize)
+        self.ttl = ttl
+        self._clock = clock
+
+    def get(self, key, default=None):
+        entry = super().get(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            with self._lock:
+                self._entries.pop(key, None)
+                self.hits -= 1
+                self.misses += 1
+            return default
+        return value
+
+    def put(self, key, value) -> None:
+        super().put(key, (self._clock() + self.ttl, value))
+
+
+class CachedEmbeddings:
+    def __init__(self, embeddings, maxsize: int = QUERY_EMBEDDING_CACHE_SIZE):
+        self.embeddings = embeddings
+        self.cache = LRUCache(maxsize)
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        key = " ".join(text.lower().split())
+        vector = self.cache.get(key)
+        METRICS.inc("embedding_cache_total", result="miss" if vector is None else "hit")
+        if vector is None:
+            with METRICS.span("query_embedding"):
+                vector = self.embeddings.embed_query(text)
+            self.cache.put(key, vector)
+        return vector
+
+
+class AnswerCache:
+    def __init__(self, maxsize: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL_SECONDS):
+        self.cache = TTLCache(maxsize, ttl)
+        self.index_version = None
+
+    def bind_index(self, index_version: str) -> None:
+        if index_version != self.index_version:
+            self.cache.clear()
+            self.index_version = index_version
+
+    def key(self, query: str, docs) -> tuple:
+        doc_ids = tuple(
+            hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()[:16]
+            for doc in docs
+        )
+        return normalize_query(query), doc_ids
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def put(self, key, answer: str) -> None:
+        self.cache.put(key, answer)
@@ -0,0 +1,149 @@
+import os
+import threading
+
+from corpus import CANONICAL_HEADER, CHUNK_OVERLAP, INGEST_MODE, POSE_HEADER_PATTERN, source_records_line
+from metrics import CHARS_PER_TOKEN, estimate_tokens
+
+
+# A canonical per-pose document runs to about 300 tokens plus its list of
+# source records.
+CONTEXT_TOKEN_BUDGET = int(os.getenv("YOGA_CONTEXT_TOKENS", "1200" if INGEST_MODE == "canonical" else "600"))
+TOKENIZER_ENCODING = "cl100k_base"
+CONTEXT_SEPARATOR = "\n\n"
+MIN_STITCH_OVERLAP = 8
+
+_encoding = None
+_encoding_lock = threading.Lock()
+_encoding_loaded = False
+
+
+def _get_encoding():
+    # tiktoken is optional and its first use may need to download the BPE
+    # table, so any failure falls back to the character estimate. The exact
+    # Mistral tokenizer differs slightly; cl100k is close enough for budgeting.
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+                except Exception:
+                    _encoding = None
+                _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:budget * CHARS_PER_TOKEN]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:budget])
+
+
+def _overlap(left: str, right: str) -> int:
+    # The splitter repeats up to CHUNK_OVERLAP characters between neighbours,
+    # so adjacent chunks share a suffix/prefix no longer than that.
+    for size in range(min(len(left), len(right), CHUNK_OVERLAP), MIN_STITCH_OVERLAP - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _segments(text: str, pose_table) -> list[tuple[int | None, str]]:
+    # A chunk can end one record and start the next; split it at each
+    # record header so every part can be matched to its full record.
+    if pose_table is None:
+        return [(None, text)]
+    segments, start, number = [], 0, None
+    for match in POSE_HEADER_PATTERN.finditer(text):
+        segments.append((number, text[start:match.start()]))
+        start, number = match.start(), int(match.group(1))
+    segments.append((number, text[start:]))
+    return [
+        (number if number in pose_table else None, segment.strip(" \n-"))
+        for number, segment in segments
+        if segment.strip(" \n-")
+    ]
+
+
+def _with_source_records(text: str, facet_index) -> str:
+    # Canonical documents are embedded without their record numbers; the
+    # full list comes from the facet index, which hot reload keeps current.
+    header, _, _ = text.partition("\n")
+    if facet_index is None or not header.startswith(CANONICAL_HEADER):
+        return text
+    numbers = facet_index.pose_numbers(header[len(CANONICAL_HEADER):].strip())
+    return f"{text}\n{source_records_line(numbers)}" if numbers else text
+
+
+def merge_pieces(docs, pose_table=None, facet_index=None) -> list[str]:
+    pieces = []
+    records = set()
+    for doc in docs:
+        number = (doc.metadata or {}).get("pose_number")
+        if pose_table is not None and number in pose_table:
+            segments = [(number, pose_table[number])]
+        else:
+            segments = _segments(doc.page_content.strip(), pose_table)
+
+        for number, text in segments:
+            if number is not None:
+                # The whole record is the stitched form of all its chunks.
+                if number in records:
+                    continue
+                records.add(number)
+                text = pose_table[number]
+            else:
+                text = _with_source_records(text, facet_index)
+            _add_piece(pieces, text)
+    return pieces
+
+
+def _add_piece(pieces: list[str], text: str) -> None:
+    if not text or any(text in piece for piece in pieces):
+        return
+    contained = [i for i, piece in enumerate(pieces) if piece in text]
+    if contained:
+        # Keep the rank of the best piece this one supersedes.
+        pieces[contained[0]] = text
+        pieces[:] = [piece for i, piece in enumerate(pieces) if i not in contained[1:]]
+        return
+
+    for i, piece in enumerate(pieces):
+        size = _overlap(piece, text)
+        if size:
+            pieces[i] = piece + text[size:]
+            return
+        size = _overlap(text, piece)
+        if size:
+            pieces[i] = text + piece[size:]
+            return
+    pieces.append(text)
+
+
+def build_context(docs, pose_table=None, budget: int = CONTEXT_TOKEN_BUDGET, facet_index=None) -> str:
+    pieces = merge_pieces(docs, pose_table, facet_index)
+    if not pieces:
+        return ""
+
+    separator_tokens = count_tokens(CONTEXT_SEPARATOR)
+    packed, used = [], 0
+    for piece in pieces:
+        tokens = count_tokens(piece)
+        cost = tokens + (separator_tokens if packed else 0)
+        if used + cost <= budget:
+            packed.append(piece)
+            used += cost
+        elif not packed:
+            # Never send an empty context: the best piece is cut to fit.
+            packed.append(truncate_to_tokens(piece, budget))
+            used = budget
+    return CONTEXT_SEPARATOR.join(packed)
@@ -0,0 +1,237 @@
+import mmap
+import os
+import re
+from collections import Counter
+from contextlib import contextmanager
+
+from metrics import estimate_tokens
+
+
+YOGA_DATA_PATH = "yoga_data.txt"
+RECORD_DELIMITER = "---"
+POSE_HEADER_PATTERN = re.compile(r"YOGA POSE #(\d+):")
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+CHUNK_SEPARATORS = ["\n\n", "\n", ".", " "]
+INGEST_MODES = ("records", "canonical")
+INGEST_MODE = os.getenv("YOGA_INGEST_MODE", "records")
+CANONICAL_HEADER = "YOGA POSE:"
+RECORD_FIELDS = [
+    "Difficulty Level",
+    "Primary Benefits",
+    "Precautions & Contraindications",
+    "Technique Tips",
+    "Chakra Association",
+]
+MULTI_VALUE_FIELDS = {"Primary Benefits", "Precautions & Contraindications"}
+# all-mpnet-base-v2 reads only the first 384 word pieces of a document.
+# The estimate counts ~4 characters per token, which undercounts word pieces
+# on this text by roughly an eighth, so 300 keeps every field inside the window.
+CANONICAL_EMBED_TOKENS = 300
+
+
+def build_splitter():
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        separators=CHUNK_SEPARATORS
+    )
+
+
+def iter_record_blocks(text: str):
+    for block in text.split(RECORD_DELIMITER):
+        record = block.strip()
+        if record:
+            yield record
+
+
+def split_record_chunks(text: str, splitter=None):
+    # Each record is split on its own, so a chunk never spans two records
+    # and editing one record leaves every other record's chunks unchanged.
+    splitter = splitter or build_splitter()
+    for record in iter_record_blocks(text):
+        yield from splitter.split_text(record)
+
+
+@contextmanager
+def open_corpus(path: str = YOGA_DATA_PATH):
+    # Read-only memory map of the corpus: pages are read on demand and
+    # shared with the OS cache, so a multi-GB file is never held in memory.
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield buffer
+
+
+def read_span(buffer, start: int, end: int) -> str:
+    # Decodes straight from the mapped pages without an intermediate copy.
+    return str(memoryview(buffer)[start:end], "utf-8")
+
+
+def iter_record_spans(buffer):
+    # Byte offsets of every record, found by scanning for the delimiter in
+    # the mapped file; yields the same records as iter_record_blocks.
+    delimiter = RECORD_DELIMITER.encode("utf-8")
+    position, size = 0, len(buffer)
+    while position < size:
+        end = buffer.find(delimiter, position)
+        if end < 0:
+            end = size
+        raw = buffer[position:end]
+        start = position + len(raw) - len(raw.lstrip())
+        stop = position + len(raw.rstrip())
+        if stop > start:
+            yield start, stop
+        position = end + len(delimiter)
+
+
+def iter_chunk_offsets(buffer, splitter=None):
+    # (start, end, chunk) for every chunk, with byte offsets into the file.
+    # A record that fits in one chunk is the splitter's output unchanged, so
+    # it is emitted as is; only longer records are split (and searched for
+    # their chunks' offsets).
+    for record_start, record_end in iter_record_spans(buffer):
+        record = read_span(buffer, record_start, record_end).strip()
+        if len(record) < CHUNK_SIZE:
+            yield record_start, record_end, record
+            continue
+        splitter = splitter or build_splitter()
+        search_from = 0
+        for chunk in splitter.split_text(record):
+            position = record.find(chunk, search_from)
+            if position < 0:
+                position = record.find(chunk)
+            search_from = position + 1
+            start = record_start + (position if record.isascii() else len(record[:position].encode("utf-8")))
+            yield start, start + len(chunk.encode("utf-8")), chunk
+
+
+def iter_chunk_spans(path: str = YOGA_DATA_PATH, model_name: str | None = None, splitter=None):
+    # (chunk id, start, end, chunk) for every chunk, streamed from the
+    # memory-mapped file one record at a time. The offsets stay valid for
+    # read_span until the file changes.
+    from vector_index import EMBEDDING_MODEL_NAME, chunk_id
+
+    model_name = model_name or EMBEDDING_MODEL_NAME
+    with open_corpus(path) as buffer:
+        for start, end, chunk in iter_chunk_offsets(buffer, splitter):
+            yield chunk_id(chunk, model_name), start, end, chunk
+
+
+def iter_chunks(path: str = YOGA_DATA_PATH):
+    with open_corpus(path) as buffer:
+        for _, _, chunk in iter_chunk_offsets(buffer):
+            yield chunk
+
+
+def iter_pose_records(text: str):
+    yield from _pose_records(iter_record_blocks(text))
+
+
+def iter_file_pose_records(path: str = YOGA_DATA_PATH):
+    with open_corpus(path) as buffer:
+        records = (read_span(buffer, start, end).strip() for start, end in iter_record_spans(buffer))
+        yield from _pose_records(records)
+
+
+def _pose_records(records):
+    for record in records:
+        match = POSE_HEADER_PATTERN.match(record)
+        if match:
+            yield int(match.group(1)), record
+
+
+def build_pose_table(text: str) -> dict[int, str]:
+    return dict(iter_pose_records(text))
+
+
+def load_pose_table(path: str = YOGA_DATA_PATH) -> dict[int, str]:
+    return dict(iter_file_pose_records(path))
+
+
+def parse_record_fields(record: str) -> dict[str, str]:
+    fields = {}
+    for line in record.splitlines():
+        label, sep, value = line.partition(":")
+        if not sep:
+            continue
+        if POSE_HEADER_PATTERN.match(line):
+            fields["Pose"] = value.strip()
+        else:
+            fields[label.strip()] = value.strip()
+    return fields
+
+
+def build_canonical_documents(text: str) -> list[str]:
+    return canonical_documents(iter_pose_records(text))
+
+
+def canonical_documents(records) -> list[str]:
+    # The generator draws every record's pose from a short list, so most
+    # records repeat a pose with a different mix of attributes. Collapsing
+    # them gives one document per pose instead of dozens of near-duplicates.
+    poses = {}
+    for number, record in records:
+        fields = parse_record_fields(record)
+        pose = poses.setdefault(fields.get("Pose", ""), {
+            "numbers": [],
+            "values": {field: Counter() for field in RECORD_FIELDS},
+        })
+        pose["numbers"].append(number)
+        for field in RECORD_FIELDS:
+            value = fields.get(field, "")
+            values = value.split(",") if field in MULTI_VALUE_FIELDS else [value]
+            for value in values:
+                if value.strip():
+                    pose["values"][field][value.strip()] += 1
+
+    # The record numbers are not part of the embedded text; FacetIndex keeps
+    # them per pose and build_context adds them back (see source_records_line).
+    return [
+        canonical_document(name, {field: pose["values"][field].most_common() for field in RECORD_FIELDS})
+        for name, pose in poses.items()
+    ]
+
+
+def canonical_document(name: str, field_values: dict, budget: int = CANONICAL_EMBED_TOKENS) -> str:
+    # Values are taken round-robin across the fields, most frequent first,
+    # so every field keeps the values most records agree on before any one
+    # field's long tail, and the whole document fits the embedder's window.
+    header = f"{CANONICAL_HEADER} {name}"
+    used = estimate_tokens(header) + sum(
+        estimate_tokens(f"\n{field}: ") for field in RECORD_FIELDS if field_values[field]
+    )
+    chosen = {field: [] for field in RECORD_FIELDS}
+    for rank in range(max((len(values) for values in field_values.values()), default=0)):
+        for field in RECORD_FIELDS:
+            values = field_values[field]
+            if rank >= len(values):
+                continue
+            cost = estimate_tokens(values[rank][0] + ", ")
+            if rank == 0 or used + cost <= budget:
+                chosen[field].append(values[rank][0])
+                used += cost
+
+    lines = [header]
+    for field in RECORD_FIELDS:
+        if chosen[field]:
+            separator = ", " if field in MULTI_VALUE_FIELDS else "; "
+            lines.append(f"{field}: {separator.join(chosen[field])}")
+    return "\n".join(lines)
+
+
+def source_records_line(numbers) -> str:
+    references = ", ".join(f"#{number}" for number in numbers)
+    return f"Source Records: {references} ({len(numbers)} records)"
+
+
+def iter_documents(path: str = YOGA_DATA_PATH, mode: str = INGEST_MODE):
+    if mode not in INGEST_MODES:
+        raise ValueError(f"Unknown ingest mode: {mode}")
+    if mode == "records":
+        return iter_chunks(path)
+    return iter(canonical_documents(iter_file_pose_records(path)))
@@ -0,0 +1,289 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import threading
+
+from embeddings import embedding_identity
+from metrics import peak_rss_mb
+
+
+EMBED_SOCKET = os.getenv("YOGA_EMBED_SOCKET", "")
+DEFAULT_EMBED_SOCKET = "/tmp/yoga-embed.sock"
+EMBED_MAX_BATCH = int(os.getenv("YOGA_EMBED_MAX_BATCH", "32"))
+EMBED_MAX_WAIT_MS = float(os.getenv("YOGA_EMBED_MAX_WAIT_MS", "2"))
+EMBED_CLIENT_TIMEOUT = 30.0
+STREAM_LIMIT = 64 * 1024 * 1024
+
+
+class EmbedServerError(Exception):
+    pass
+
+
+def _tcp_address(address: str) -> tuple[str, int] | None:
+    # "host:port" selects TCP; anything else is a Unix socket path.
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and not address.startswith("/"):
+        return host or "127.0.0.1", int(port)
+    return None
+
+
+class MicroBatcher:
+    def __init__(self, embed_batch, max_batch: int = EMBED_MAX_BATCH, max_wait: float = EMBED_MAX_WAIT_MS / 1000):
+        self.embed_batch = embed_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.items = 0
+
+    async def embed(self, text: str):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, future))
+        return await future
+
+    async def _collect(self) -> list:
+        batch = [await self.queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self) -> None:
+        # One forward pass at a time: requests that arrive while the model is
+        # busy queue up and go out together in the next batch.
+        while True:
+            batch = await self._collect()
+            texts = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                vectors = dict(zip(texts, await asyncio.to_thread(self.embed_batch, texts)))
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for text, future in batch:
+                if not future.done():
+                    future.set_result(vectors[text])
+
+
+class EmbeddingServer:
+    def __init__(self, embeddings, vector_db=None, index_stats=None, max_batch: int = EMBED_MAX_BATCH,
+                 max_wait: float = EMBED_MAX_WAIT_MS / 1000, model_name: str | None = None):
+        self.embeddings = embeddings
+        self.vector_db = vector_db
+        self.index_stats = index_stats or {}
+        self.model_name = model_name or embedding_identity()
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batcher = None
+
+    async def _embed(self, texts: list[str]) -> list:
+        # Large document batches are already efficient and would only delay
+        # the queries queued behind them, so they bypass the batcher.
+        if len(texts) > self.max_batch:
+            return await asyncio.to_thread(self.embeddings.embed_documents, texts)
+        return list(await asyncio.gather(*(self.batcher.embed(text) for text in texts)))
+
+    async def _search(self, request: dict) -> list[dict]:
+        if self.vector_db is None:
+            raise EmbedServerError("This server was started without a vector store")
+        vector = request.get("vector")
+        if vector is None:
+            vector = await self.batcher.embed(request["query"])
+        docs = await asyncio.to_thread(self.vector_db.similarity_search_by_vector, vector, k=request.get("k", 4))
+        return [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in docs]
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model_name,
+            "vector_store": self.vector_db is not None,
+            "index": self.index_stats,
+            "batches": self.batcher.batches,
+            "items": self.batcher.items,
+            "mean_batch": round(self.batcher.items / self.batcher.batches, 2) if self.batcher.batches else None,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+    async def _dispatch(self, request: dict):
+        op = request.get("op")
+        if op == "embed":
+            return await self._embed(request["texts"])
+        if op == "search":
+            return await self._search(request)
+        if op == "stats":
+            return self.stats()
+        raise EmbedServerError(f"Unknown operation: {op}")
+
+    async def handle(self, reader, writer) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = json.loads(line)
+                try:
+                    response = {"id": request.get("id"), "result": await self._dispatch(request)}
+                except Exception as e:
+                    response = {"id": request.get("id"), "error": f"{type(e).__name__}: {e}"}
+                writer.write(json.dumps(response, default=float).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, address: str = DEFAULT_EMBED_SOCKET, ready=None) -> None:
+        self.batcher = MicroBatcher(self.embeddings.embed_documents, self.max_batch, self.max_wait)
+        batcher_task = asyncio.create_task(self.batcher.run())
+        tcp = _tcp_address(address)
+        if tcp is not None:
+            server = await asyncio.start_server(self.handle, *tcp, limit=STREAM_LIMIT)
+        else:
+            if os.path.exists(address):
+                os.unlink(address)
+            server = await asyncio.start_unix_server(self.handle, address, limit=STREAM_LIMIT)
+        if ready is not None:
+            ready()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher_task.cancel()
+            if tcp is None and os.path.exists(address):
+                os.unlink(address)
+
+
+class EmbedClient:
+    # One blocking connection per thread: retrieval runs on worker threads
+    # (asyncio.to_thread in the service, Streamlit's script threads), and
+    # each connection has at most one request in flight.
+    def __init__(self, address: str = EMBED_SOCKET or DEFAULT_EMBED_SOCKET, timeout: float = EMBED_CLIENT_TIMEOUT):
+        self.address = address
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            tcp = _tcp_address(self.address)
+            if tcp is not None:
+                sock = socket.create_connection(tcp, timeout=self.timeout)
+            else:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.settimeout(self.timeout)
+                sock.connect(self.address)
+            connection = self._local.connection = (sock, sock.makefile("rb"))
+            self._local.next_id = 0
+        return connection
+
+    def call(self, op: str, **payload):
+        sock, reader = self._connection()
+        self._local.next_id += 1
+        request_id = self._local.next_id
+        try:
+            sock.sendall(json.dumps({"id": request_id, "op": op, **payload}).encode("utf-8") + b"\n")
+            line = reader.readline()
+        except OSError:
+            self.close()
+            raise
+        if not line:
+            self.close()
+            raise EmbedServerError(f"Embedding server at {self.address} closed the connection")
+        response = json.loads(line)
+        if response.get("id") != request_id:
+            self.close()
+            raise EmbedServerError("Out-of-order response from the embedding server")
+        if "error" in response:
+            raise EmbedServerError(response["error"])
+        return response["result"]
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        self._local.connection = None
+        if connection is not None:
+            connection[1].close()
+            connection[0].close()
+
+
+class RemoteEmbeddings:
+    def __init__(self, client: EmbedClient):
+        self.client = client
+
+    def embed_documents(self, texts):
+        return self.client.call("embed", texts=list(texts))
+
+    def embed_query(self, text):
+        return self.client.call("embed", texts=[text])[0]
+
+
+class RemoteVectorStore:
+    def __init__(self, client: EmbedClient, embeddings=None):
+        self.client = client
+        self.embeddings = embeddings
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, **kwargs) -> list:
+        from langchain_core.documents import Document
+
+        return [Document(**doc) for doc in self.client.call("search", vector=[float(x) for x in embedding], k=k)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> list:
+        # Embedding locally first lets the worker's query cache answer
+        # repeats without a round trip; the server batches the misses.
+        if self.embeddings is not None:
+            return self.similarity_search_by_vector(self.embeddings.embed_query(query), k)
+        from langchain_core.documents import Document
+
+        return [Document(**doc) for doc in self.client.call("search", query=query, k=k)]
+
+    def as_retriever(self, search_type: str = "similarity", search_kwargs: dict | None = None):
+        from flat_index import SimilarityRetriever
+
+        if search_type != "similarity":
+            raise ValueError(f"RemoteVectorStore only supports similarity search, not {search_type}")
+        return SimilarityRetriever(self, (search_kwargs or {}).get("k", 4))
+
+
+def main():
+    from corpus import YOGA_DATA_PATH, iter_documents
+    from embeddings import build_embeddings
+    from vector_index import CHROMA_DB_PATH, open_vector_store
+
+    parser = argparse.ArgumentParser(description="Shared embedding and retrieval server for app workers.")
+    parser.add_argument("--socket", default=EMBED_SOCKET or DEFAULT_EMBED_SOCKET,
+                        help="Unix socket path, or host:port for TCP")
+    parser.add_argument("--data", default=YOGA_DATA_PATH)
+    parser.add_argument("--persist-dir", default=CHROMA_DB_PATH)
+    parser.add_argument("--max-batch", type=int, default=EMBED_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=EMBED_MAX_WAIT_MS)
+    parser.add_argument("--embed-only", action="store_true",
+                        help="serve embeddings only; each worker then opens its own vector store")
+    args = parser.parse_args()
+
+    embeddings = build_embeddings()
+    vector_db, index_stats = None, None
+    if not args.embed_only:
+        vector_db, index_stats = open_vector_store(iter_documents(args.data), embeddings, args.persist_dir)
+
+    server = EmbeddingServer(embeddings, vector_db, index_stats, args.max_batch, args.max_wait_ms / 1000)
+    print(f"Embedding server listening on {args.socket}", flush=True)
+    try:
+        asyncio.run(server.serve(args.socket))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import math
+import os
+import re
+import zlib
+
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+EMBEDDING_BACKENDS = ("huggingface", "onnx", "hashing")
+EMBEDDING_BACKEND = os.getenv("YOGA_EMBEDDING_BACKEND", "huggingface")
+ONNX_MODEL_DIR = os.getenv("YOGA_ONNX_MODEL_DIR", "./onnx_model")
+ONNX_QUANTIZATION = os.getenv("YOGA_ONNX_QUANTIZATION", "avx2")
+ONNX_THREADS = int(os.getenv("YOGA_ONNX_THREADS", "0"))
+HASHING_DIM = 384
+ENCODE_BATCH_SIZE = 32
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def embedding_identity(backend: str = EMBEDDING_BACKEND, model_name: str = EMBEDDING_MODEL_NAME) -> str:
+    # Recorded in every index so vectors from different backends are never
+    # mixed. The plain model name is kept for the original backend so
+    # indexes built before backends were pluggable stay valid.
+    if backend == "huggingface":
+        return model_name
+    if backend == "onnx":
+        return f"{model_name}#onnx-qint8-{ONNX_QUANTIZATION}"
+    if backend == "hashing":
+        return f"hashing-{HASHING_DIM}"
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+class HashingEmbeddings:
+    # Deterministic feature hashing: no model download, no randomness, and
+    # fast enough for offline tests and very large benchmark corpora.
+    def __init__(self, dim: int = HASHING_DIM):
+        self.dim = dim
+
+    def _embed(self, text: str) -> list[float]:
+        vector = [0.0] * self.dim
+        for token in TOKEN_PATTERN.findall(text.lower()):
+            bucket = zlib.crc32(token.encode("utf-8"))
+            vector[bucket % self.dim] += 1.0 if bucket & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector))
+        return [value / norm for value in vector] if norm else vector
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class SentenceTransformerEmbeddings:
+    def __init__(self, model, batch_size: int = ENCODE_BATCH_SIZE):
+        self.model = model
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts):
+        vectors = self.model.encode(list(texts), batch_size=self.batch_size, show_progress_bar=False)
+        return vectors.tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def build_onnx_embeddings(
+    model_name: str = EMBEDDING_MODEL_NAME,
+    model_dir: str = ONNX_MODEL_DIR,
+    quantization: str = ONNX_QUANTIZATION,
+    threads: int = ONNX_THREADS,
+):
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    file_name = f"onnx/model_qint8_{quantization}.onnx"
+    if not os.path.exists(os.path.join(model_dir, file_name)):
+        # One-off export to ONNX followed by dynamic int8 quantization of the
+        # weights; later starts load the quantized file directly.
+        model = SentenceTransformer(model_name, backend="onnx", device="cpu")
+        model.save(model_dir)
+        export_dynamic_quantized_onnx_model(model, quantization, model_dir)
+
+    model_kwargs = {"file_name": file_name, "provider": "CPUExecutionProvider"}
+    if threads:
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        model_kwargs["session_options"] = options
+    return SentenceTransformerEmbeddings(
+        SentenceTransformer(model_dir, backend="onnx", device="cpu", model_kwargs=model_kwargs)
+    )
+
+
+def build_embeddings(backend: str = EMBEDDING_BACKEND, model_name: str = EMBEDDING_MODEL_NAME):
+    if backend == "huggingface":
+        # sentence-transformers pulls in torch; import it only when a model
+        # is actually needed so importing this module stays cheap.
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        return HuggingFaceEmbeddings(
+            model_name=model_name,
+            model_kwargs={"device": "cpu"}
+        )
+    if backend == "onnx":
+        return build_onnx_embeddings(model_name)
+    if backend == "hashing":
+        return HashingEmbeddings()
+    raise ValueError(f"Unknown embedding backend: {backend}")
@@ -0,0 +1,198 @@
+import re
+
+from corpus import MULTI_VALUE_FIELDS, RECORD_FIELDS, parse_record_fields
+
+
+FACET_FIELDS = RECORD_FIELDS
+CONTRAINDICATION_FIELD = "Precautions & Contraindications"
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "for", "if", "you", "your",
+    "have", "has", "with", "in", "on", "is", "are", "be", "that", "this",
+    "it", "do", "does", "i", "my", "me", "what", "which", "how", "can",
+    "pose", "poses", "yoga", "asana", "asanas", "good", "best", "help",
+    "avoid", "skip", "not", "recommended", "suitable", "contraindicated",
+    "during", "some", "practitioners", "safe", "okay", "ok", "fine",
+    "without", "energy",
+}
+
+# The verb a stored value starts with is dropped so "reduce back pain" still
+# matches "reduces lower back pain" on its content words.
+LEADING_VERBS = {
+    "improves", "increases", "enhances", "reduces", "promotes", "boosts",
+    "strengthens", "opens", "calms", "builds", "activates", "grounds",
+    "balances", "connects", "aligns",
+}
+
+# A contraindication named in the query is an exclusion when the user asks
+# what is safe with it, and an inclusion otherwise ("poses to avoid with ...").
+SAFE_WITH_CUES = {"safe", "suitable", "okay", "ok", "fine", "without"}
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _stem(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        word = word[:-3] + "y"
+    elif len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        word = word[:-1]
+    if len(word) > 5 and word.endswith("ing"):
+        word = word[:-3]
+    if len(word) > 3 and word.endswith("e"):
+        word = word[:-1]
+    return word
+
+
+def _terms(text: str) -> frozenset[str]:
+    return frozenset(
+        _stem(word) for word in WORD_PATTERN.findall(text.lower())
+        if word not in STOPWORDS
+    )
+
+
+def _value_terms(value: str) -> frozenset[str]:
+    first, _, rest = value.partition(" ")
+    return _terms(rest if first in LEADING_VERBS else value)
+
+
+def _positions(bits: int):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class FacetIndex:
+    def __init__(self, records):
+        self.numbers = []
+        self.names = []
+        self.positions = {}
+        # Pose name -> bitmap of its records: the back-references of the
+        # canonical per-pose documents, which do not embed them.
+        self.pose_bits = {}
+        self.postings = {field: {} for field in FACET_FIELDS}
+        self.value_terms = {field: {} for field in FACET_FIELDS}
+
+        for number, record in records:
+            self._append(number, record)
+
+        self.all_bits = (1 << len(self.numbers)) - 1
+
+    def _append(self, number: int, record: str) -> int:
+        position = len(self.numbers)
+        self.numbers.append(number)
+        self.positions[number] = position
+        self.names.append("")
+        self._index_record(position, record)
+        return position
+
+    def _index_record(self, position: int, record: str) -> None:
+        fields = parse_record_fields(record)
+        name = fields.get("Pose", "")
+        self.names[position] = name
+        self.pose_bits[name] = self.pose_bits.get(name, 0) | (1 << position)
+        for field in FACET_FIELDS:
+            raw = fields.get(field, "")
+            values = raw.split(",") if field in MULTI_VALUE_FIELDS else [raw]
+            for value in values:
+                value = value.strip().lower()
+                if not value:
+                    continue
+                postings = self.postings[field]
+                postings[value] = postings.get(value, 0) | (1 << position)
+                if value not in self.value_terms[field]:
+                    self.value_terms[field][value] = _value_terms(value)
+
+    def _clear(self, position: int) -> None:
+        bit = 1 << position
+        self.all_bits &= ~bit
+        name = self.names[position]
+        if self.pose_bits.get(name, 0) & ~bit:
+            self.pose_bits[name] &= ~bit
+        else:
+            self.pose_bits.pop(name, None)
+        for field, postings in self.postings.items():
+            for value, bitmap in list(postings.items()):
+                if not bitmap & bit:
+                    continue
+                if bitmap & ~bit:
+                    postings[value] = bitmap & ~bit
+                else:
+                    del postings[value]
+                    del self.value_terms[field][value]
+
+    def updated(self, changed: dict, removed) -> "FacetIndex":
+        # Copy-on-write, like BM25Index.updated. Bitmaps are immutable ints,
+        # so copying the per-field dicts is enough. A removed record leaves
+        # its position empty rather than renumbering every later record.
+        index = FacetIndex(())
+        index.numbers = list(self.numbers)
+        index.names = list(self.names)
+        index.positions = dict(self.positions)
+        index.pose_bits = dict(self.pose_bits)
+        index.postings = {field: dict(values) for field, values in self.postings.items()}
+        index.value_terms = {field: dict(values) for field, values in self.value_terms.items()}
+        index.all_bits = self.all_bits
+
+        for number in [*removed, *changed]:
+            if number in index.positions:
+                index._clear(index.positions[number])
+        for number in removed:
+            index.positions.pop(number, None)
+        for number, record in changed.items():
+            position = index.positions.get(number)
+            if position is None:
+                position = index._append(number, record)
+            else:
+                index._index_record(position, record)
+            index.all_bits |= 1 << position
+        return index
+
+    def match_query(self, query: str) -> dict:
+        query_terms = _terms(query)
+        safe_with = any(word in SAFE_WITH_CUES for word in WORD_PATTERN.findall(query.lower()))
+
+        include, exclude = [], []
+        for field, values in self.value_terms.items():
+            for value, terms in values.items():
+                if not terms or not terms <= query_terms:
+                    continue
+                if field == CONTRAINDICATION_FIELD and safe_with:
+                    exclude.append((field, value))
+                else:
+                    include.append((field, value))
+        return {"include": include, "exclude": exclude}
+
+    def resolve(self, include, exclude=()) -> list[int]:
+        by_field = {}
+        for field, value in include:
+            by_field.setdefault(field, []).append(self.postings[field].get(value, 0))
+
+        bits = self.all_bits
+        for field, bitmaps in by_field.items():
+            if field in MULTI_VALUE_FIELDS:
+                for bitmap in bitmaps:
+                    bits &= bitmap
+            else:
+                combined = 0
+                for bitmap in bitmaps:
+                    combined |= bitmap
+                bits &= combined
+
+        for field, value in exclude:
+            bits &= ~self.postings[field].get(value, 0)
+
+        return [self.numbers[position] for position in _positions(bits)]
+
+    def search(self, query: str) -> dict | None:
+        filters = self.match_query(query)
+        if not filters["include"]:
+            return None
+        filters["numbers"] = self.resolve(filters["include"], filters["exclude"])
+        return filters
+
+    def pose_name(self, number: int) -> str:
+        return self.names[self.positions[number]]
+
+    def pose_numbers(self, name: str) -> list[int]:
+        return [self.numbers[position] for position in _positions(self.pose_bits.get(name, 0))]
@@ -0,0 +1,254 @@
+import json
+import os
+
+import numpy as np
+from langchain_core.documents import Document
+
+from vector_index import (
+    CHROMA_DB_PATH,
+    EMBEDDING_MODEL_NAME,
+    WRITE_BATCH_SIZE,
+    check_embedding_identity,
+    chunk_id,
+    index_fingerprint,
+    stored_embedding_identity,
+)
+
+
+FLAT_INDEX_DIRNAME = "flat"
+FLAT_INDEX_PATH = os.path.join(CHROMA_DB_PATH, FLAT_INDEX_DIRNAME)
+FLAT_INDEX_VERSION = 1
+FLAT_DTYPES = ("float32", "float16", "int8")
+SCORE_BLOCK_ROWS = 65536
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> tuple[np.ndarray, np.ndarray | None]:
+    if dtype == "int8":
+        if not len(vectors):
+            # An empty corpus gives a (0, 0) matrix, which has no row maxima.
+            return vectors.astype(np.int8), np.zeros(0, dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+    return vectors.astype(dtype), None
+
+
+def _write_npy(path: str, array: np.ndarray) -> str:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    return tmp_path
+
+
+def _write_json(path: str, payload: dict) -> str:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        # dumps() uses the C encoder; dump() streams through the pure-Python one.
+        f.write(json.dumps(payload))
+    return tmp_path
+
+
+class SimilarityRetriever:
+    def __init__(self, store, k: int):
+        self.store = store
+        self.k = k
+
+    def invoke(self, query: str) -> list[Document]:
+        return self.store.similarity_search(query, k=self.k)
+
+
+class FlatVectorStore:
+    def __init__(self, embeddings, ids, texts, vectors, scales=None, model_name: str = EMBEDDING_MODEL_NAME):
+        self.embeddings = embeddings
+        self.ids = ids
+        self.texts = texts
+        self.vectors = vectors
+        self.scales = scales
+        self.model_name = model_name
+
+    @classmethod
+    def open(cls, path: str, embeddings, model_name: str = EMBEDDING_MODEL_NAME):
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != FLAT_INDEX_VERSION or meta.get("model") != model_name:
+            return None
+
+        with open(os.path.join(path, "texts.json"), "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        # The vectors stay on disk and are paged in by the OS on first use,
+        # so opening costs only the text table.
+        vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        scales = None
+        if meta["dtype"] == "int8":
+            scales = np.load(os.path.join(path, "scales.npy"), mmap_mode="r")
+        store = cls(embeddings, payload["ids"], payload["texts"], vectors, scales, model_name)
+        store.fingerprint = meta["fingerprint"]
+        store.dtype = meta["dtype"]
+        store.path = path
+        return store
+
+    @classmethod
+    def sync(
+        cls,
+        chunks,
+        embeddings,
+        path: str = FLAT_INDEX_PATH,
+        dtype: str = "float16",
+        model_name: str = EMBEDDING_MODEL_NAME,
+        batch_size: int = WRITE_BATCH_SIZE,
+        allow_rebuild: bool = False,
+    ):
+        if dtype not in FLAT_DTYPES:
+            raise ValueError(f"Unsupported flat index dtype: {dtype}")
+        check_embedding_identity(stored_embedding_identity(path), model_name, f"Flat index at {path!r}", allow_rebuild)
+
+        wanted = {}
+        for chunk in chunks:
+            wanted.setdefault(chunk_id(chunk, model_name), chunk)
+        ids = list(wanted)
+        fingerprint = index_fingerprint(ids)
+
+        existing = cls.open(path, embeddings, model_name)
+        if existing is not None and existing.fingerprint == fingerprint and existing.dtype == dtype:
+            return existing, {"added": 0, "deleted": 0, "total": len(ids), "fingerprint": fingerprint}
+
+        reused = {}
+        previous_count = 0
+        if existing is not None:
+            positions = {id_: position for position, id_ in enumerate(existing.ids)}
+            for id_ in ids:
+                if id_ in positions:
+                    reused[id_] = existing.vector(positions[id_])
+            previous_count = len(existing.ids)
+            # Drop the memory maps before the files underneath are replaced.
+            existing = None
+
+        missing = [id_ for id_ in ids if id_ not in reused]
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            vectors = embeddings.embed_documents([wanted[id_] for id_ in batch])
+            for id_, vector in zip(batch, vectors):
+                reused[id_] = np.asarray(vector, dtype=np.float32)
+
+        matrix = _normalize(np.vstack([reused[id_] for id_ in ids])) if ids else np.zeros((0, 0), np.float32)
+        stored, scales = quantize(matrix, dtype)
+        built = cls(embeddings, ids, [wanted[id_] for id_ in ids], stored, scales, model_name)
+        built.fingerprint = fingerprint
+        built.dtype = dtype
+        built.path = path
+        built.save()
+
+        deleted = previous_count - (len(ids) - len(missing))
+        store = cls.open(path, embeddings, model_name)
+        return store, {"added": len(missing), "deleted": deleted, "total": len(ids), "fingerprint": fingerprint}
+
+    def save(self) -> None:
+        # Every file is written to a temporary first. meta.json is removed
+        # before the others are swapped in and restored last, so an
+        # interrupted save leaves an index open() ignores rather than new
+        # vectors next to old texts.
+        os.makedirs(self.path, exist_ok=True)
+        files = [(_write_npy(os.path.join(self.path, "vectors.npy"), np.asarray(self.vectors)), "vectors.npy")]
+        if self.scales is not None:
+            files.append((_write_npy(os.path.join(self.path, "scales.npy"), np.asarray(self.scales)), "scales.npy"))
+        files.append((_write_json(os.path.join(self.path, "texts.json"), {"ids": self.ids, "texts": self.texts}), "texts.json"))
+        meta_path = os.path.join(self.path, "meta.json")
+        meta_tmp_path = _write_json(meta_path, {
+            "version": FLAT_INDEX_VERSION,
+            "model": self.model_name,
+            "dtype": self.dtype,
+            "dim": int(self.vectors.shape[1]) if self.ids else 0,
+            "fingerprint": self.fingerprint,
+        })
+
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        for tmp_path, name in files:
+            os.replace(tmp_path, os.path.join(self.path, name))
+        os.replace(meta_tmp_path, meta_path)
+
+    def apply_changes(self, upserts: dict, deletes) -> "FlatVectorStore":
+        # Returns a new in-memory store and leaves this one untouched, so
+        # searches in flight finish against a consistent matrix. save()
+        # persists it; the old memory maps stay valid until released.
+        removed = set(deletes)
+        keep = [position for position, id_ in enumerate(self.ids) if id_ not in removed]
+        kept_ids = {self.ids[position] for position in keep}
+        new = {id_: text for id_, text in upserts.items() if id_ not in kept_ids}
+
+        ids = [self.ids[position] for position in keep] + list(new)
+        texts = [self.texts[position] for position in keep] + list(new.values())
+        vectors = np.asarray(self.vectors[keep])
+        scales = np.asarray(self.scales[keep]) if self.scales is not None else None
+        if new:
+            added = _normalize(np.asarray(self.embeddings.embed_documents(list(new.values())), dtype=np.float32))
+            added, added_scales = quantize(added, self.dtype)
+            vectors = np.concatenate([vectors, added]) if len(vectors) else added
+            if scales is not None:
+                scales = np.concatenate([scales, added_scales])
+
+        store = FlatVectorStore(self.embeddings, ids, texts, vectors, scales, self.model_name)
+        store.fingerprint = index_fingerprint(ids)
+        store.dtype = self.dtype
+        store.path = self.path
+        return store
+
+    def vector(self, position: int) -> np.ndarray:
+        row = np.array(self.vectors[position], dtype=np.float32)
+        if self.scales is not None:
+            row = row * self.scales[position]
+        return row
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        blocks = []
+        for start in range(0, len(self.ids), SCORE_BLOCK_ROWS):
+            block = np.asarray(self.vectors[start:start + SCORE_BLOCK_ROWS], dtype=np.float32)
+            scores = block @ queries.T
+            if self.scales is not None:
+                scores *= np.asarray(self.scales[start:start + SCORE_BLOCK_ROWS])[:, None]
+            blocks.append(scores)
+        return np.vstack(blocks).T
+
+    def search_vectors(self, queries, k: int) -> list[list[tuple[int, float]]]:
+        queries = _normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        if not self.ids:
+            return [[] for _ in queries]
+
+        k = min(k, len(self.ids))
+        scores = self._scores(queries)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in zip(scores, top):
+            ordered = candidates[np.argsort(-row[candidates])]
+            results.append([(int(position), float(row[position])) for position in ordered])
+        return results
+
+    def _documents(self, hits) -> list[Document]:
+        return [
+            Document(page_content=self.texts[position], metadata={"chunk_id": self.ids[position], "score": score})
+            for position, score in hits
+        ]
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, **kwargs) -> list[Document]:
+        return self._documents(self.search_vectors(embedding, k)[0])
+
+    def similarity_search_by_vectors(self, embeddings, k: int = 4) -> list[list[Document]]:
+        return [self._documents(hits) for hits in self.search_vectors(embeddings, k)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> list[Document]:
+        return self.similarity_search_by_vector(self.embeddings.embed_query(query), k)
+
+    def as_retriever(self, search_type: str = "similarity", search_kwargs: dict | None = None):
+        if search_type != "similarity":
+            raise ValueError(f"FlatVectorStore only supports similarity search, not {search_type}")
+        return SimilarityRetriever(self, (search_kwargs or {}).get("k", 4))
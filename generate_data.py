@@ -1,4 +1,9 @@
+import argparse
+import json
+import multiprocessing
+import os
 import random
+from collections import deque
 
 POSES = [
     "Tadasana (Mountain Pose)", "Uttanasana (Forward Fold)", "Adho Mukha Svanasana (Downward Dog)",
@@ -81,40 +86,131 @@ CHAKRAS = [
 LEVELS = ["Beginner", "Intermediate", "Advanced", "Beginner-Intermediate", "Intermediate-Advanced"]
 
 
-def generate_yoga_data(num_entries=1000):
-    data_lines = []
-    
-    for i in range(num_entries):
-        pose = random.choice(POSES)
-        benefits = ", ".join(random.sample(BENEFITS, random.randint(2, 4)))
-        contraindications = ", ".join(random.sample(CONTRAINDICATIONS, random.randint(1, 3)))
-        technique = random.choice(TECHNIQUES)
-        chakra = random.choice(CHAKRAS)
-        level = random.choice(LEVELS)
-        
-        entry = f"""
-YOGA POSE #{i+1}: {pose}
-Difficulty Level: {level}
-Primary Benefits: {benefits}
-Precautions & Contraindications: {contraindications}
-Technique Tips: {technique}
-Chakra Association: {chakra}
+RECORDS_PER_BLOCK = 10_000
+OUTPUT_FORMATS = ("text", "jsonl", "parquet")
+DEFAULT_OUTPUTS = {"text": "yoga_data.txt", "jsonl": "yoga_data.jsonl", "parquet": "yoga_data.parquet"}
+
+
+def generate_record(rng, number):
+    return {
+        "number": number,
+        "pose": rng.choice(POSES),
+        "benefits": rng.sample(BENEFITS, rng.randint(2, 4)),
+        "contraindications": rng.sample(CONTRAINDICATIONS, rng.randint(1, 3)),
+        "technique": rng.choice(TECHNIQUES),
+        "chakra": rng.choice(CHAKRAS),
+        "difficulty": rng.choice(LEVELS),
+    }
+
+
+def format_text_record(record):
+    return f"""
+YOGA POSE #{record["number"]}: {record["pose"]}
+Difficulty Level: {record["difficulty"]}
+Primary Benefits: {", ".join(record["benefits"])}
+Precautions & Contraindications: {", ".join(record["contraindications"])}
+Technique Tips: {record["technique"]}
+Chakra Association: {record["chakra"]}
 ---"""
-        data_lines.append(entry)
-    
-    return "\n".join(data_lines)
 
 
-def save_yoga_data(filename="yoga_data.txt"):
-    print(f"Generating {1000} yoga data entries...")
-    data = generate_yoga_data(1000)
-    
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(data)
-    
-    print(f"Successfully saved {len(data.split('---'))} yoga entries to {filename}")
-    print(f"File size: {len(data) / 1024:.2f} KB")
+def iter_block_records(seed, block, num_entries):
+    # Every block of records has its own generator seeded from (seed, block),
+    # so the output is identical however many workers produce it.
+    rng = random.Random(f"{seed}:{block}")
+    start = block * RECORDS_PER_BLOCK
+    for i in range(start, min(start + RECORDS_PER_BLOCK, num_entries)):
+        yield generate_record(rng, i + 1)
+
+
+def render_block(task):
+    seed, block, num_entries, fmt = task
+    records = iter_block_records(seed, block, num_entries)
+    if fmt == "text":
+        return "\n".join(format_text_record(record) for record in records)
+    if fmt == "jsonl":
+        return "".join(json.dumps(record) + "\n" for record in records)
+    return list(records)
+
+
+def iter_rendered_blocks(num_entries, seed, fmt="text", workers=1):
+    tasks = [(seed, block, num_entries, fmt) for block in range(-(-num_entries // RECORDS_PER_BLOCK))]
+    if workers <= 1:
+        yield from map(render_block, tasks)
+        return
+
+    with multiprocessing.Pool(workers) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.apply_async(render_block, (task,)))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def generate_yoga_data(num_entries=1000, seed=None):
+    if seed is None:
+        seed = random.SystemRandom().randrange(2 ** 32)
+    return "\n".join(iter_rendered_blocks(num_entries, seed))
+
+
+def write_parquet(filename, blocks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for records in blocks:
+            table = pa.Table.from_pylist(records)
+            if writer is None:
+                writer = pq.ParquetWriter(filename, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def save_yoga_data(filename="yoga_data.txt", num_entries=1000, seed=None, workers=1, fmt="text"):
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {fmt}")
+    if seed is None:
+        seed = random.SystemRandom().randrange(2 ** 32)
+
+    print(f"Generating {num_entries} yoga data entries (seed {seed})...")
+    blocks = iter_rendered_blocks(num_entries, seed, fmt, workers)
+
+    if fmt == "parquet":
+        write_parquet(filename, blocks)
+    else:
+        separator = "\n" if fmt == "text" else ""
+        with open(filename, "w", encoding="utf-8") as f:
+            for i, block in enumerate(blocks):
+                if i and separator:
+                    f.write(separator)
+                f.write(block)
+
+    print(f"Successfully saved {num_entries} yoga entries to {filename}")
+    print(f"File size: {os.path.getsize(filename) / 1024:.2f} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the synthetic yoga knowledge base.")
+    parser.add_argument("--count", type=int, default=1000, help="number of records")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible output")
+    parser.add_argument("--workers", type=int, default=1, help="processes generating record blocks")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="text")
+    parser.add_argument("--output", default=None, help="output file (default depends on format)")
+    args = parser.parse_args()
+
+    save_yoga_data(
+        args.output or DEFAULT_OUTPUTS[args.format],
+        num_entries=args.count,
+        seed=args.seed,
+        workers=args.workers,
+        fmt=args.format
+    )
 
 
 if __name__ == "__main__":
-    save_yoga_data("yoga_data.txt")
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import time
+
+from corpus import INGEST_MODE, INGEST_MODES, YOGA_DATA_PATH, iter_documents
+from embeddings import EMBEDDING_BACKEND, EMBEDDING_BACKENDS, build_embeddings, embedding_identity
+from lexical import load_or_build_lexical_index
+from metrics import peak_rss_mb
+from vector_index import CHROMA_DB_PATH, WRITE_BATCH_SIZE, open_vector_store
+
+
+def run_ingest(
+    data_path: str = YOGA_DATA_PATH,
+    persist_directory: str = CHROMA_DB_PATH,
+    batch_size: int = WRITE_BATCH_SIZE,
+    workers: int = 1,
+    verbose: bool = True,
+    mode: str = INGEST_MODE,
+    embedding_backend: str = EMBEDDING_BACKEND,
+    rebuild: bool = False,
+) -> dict:
+    if not os.path.exists(data_path):
+        raise FileNotFoundError(f"{data_path} not found! Run generate_data.py first.")
+
+    started = time.perf_counter()
+    embeddings = build_embeddings(embedding_backend)
+    model_seconds = time.perf_counter() - started
+
+    embedded = 0
+    embed_started = time.perf_counter()
+
+    def report(batch_count: int) -> None:
+        nonlocal embedded
+        embedded += batch_count
+        if verbose:
+            elapsed = time.perf_counter() - embed_started
+            print(f"  embedded {embedded} chunks ({embedded / elapsed:.1f} chunks/sec)", flush=True)
+
+    _, stats = open_vector_store(
+        iter_documents(data_path, mode),
+        embeddings,
+        persist_directory,
+        batch_size=batch_size,
+        workers=workers,
+        on_batch=report,
+        model_name=embedding_identity(embedding_backend),
+        allow_rebuild=rebuild
+    )
+    sync_seconds = time.perf_counter() - embed_started
+
+    lexical_started = time.perf_counter()
+    load_or_build_lexical_index(iter_documents(data_path, mode), persist_directory)
+    lexical_seconds = time.perf_counter() - lexical_started
+
+    return {
+        **stats,
+        "mode": mode,
+        "embedding_backend": embedding_backend,
+        "batch_size": batch_size,
+        "workers": workers,
+        "model_load_seconds": round(model_seconds, 3),
+        "vector_sync_seconds": round(sync_seconds, 3),
+        "lexical_index_seconds": round(lexical_seconds, 3),
+        "total_seconds": round(time.perf_counter() - started, 3),
+        "chunks_per_second": round(stats["added"] / sync_seconds, 1) if stats["added"] else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embed yoga_data.txt into the persisted vector store.")
+    parser.add_argument("--data", default=YOGA_DATA_PATH, help="corpus file to ingest")
+    parser.add_argument("--persist-dir", default=CHROMA_DB_PATH, help="vector store directory")
+    parser.add_argument("--batch-size", type=int, default=WRITE_BATCH_SIZE, help="chunks per embedding batch")
+    parser.add_argument("--workers", type=int, default=2, help="parallel embedding workers")
+    parser.add_argument("--mode", choices=INGEST_MODES, default=INGEST_MODE,
+                        help="index record chunks, or one canonical document per pose")
+    parser.add_argument("--embedding-backend", choices=EMBEDDING_BACKENDS, default=EMBEDDING_BACKEND)
+    parser.add_argument("--rebuild", action="store_true",
+                        help="re-embed an index built with a different embedding backend or model")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = run_ingest(
+        data_path=args.data,
+        persist_directory=args.persist_dir,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        verbose=not args.json,
+        mode=args.mode,
+        embedding_backend=args.embedding_backend,
+        rebuild=args.rebuild
+    )
+
+    if args.json:
+        print(json.dumps(report))
+        return
+
+    print(f"Indexed {report['total']} chunks ({report['added']} embedded, {report['deleted']} deleted)")
+    if report["chunks_per_second"]:
+        print(f"Throughput: {report['chunks_per_second']} chunks/sec")
+    print(f"Total time: {report['total_seconds']}s")
+    if report["peak_rss_mb"] is not None:
+        print(f"Peak RSS: {report['peak_rss_mb']:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
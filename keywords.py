@@ -0,0 +1,83 @@
+import re
+
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+POSSESSIVE_PATTERN = re.compile(r"['’]s\b")
+SUFFIXES = ("s", "es", "ed", "ing", "er", "ers", "ful")
+
+
+def tokenize(text: str) -> list[str]:
+    return WORD_PATTERN.findall(POSSESSIVE_PATTERN.sub("", text.lower()))
+
+
+def _inflections(word: str) -> set[str]:
+    forms = {word}
+    forms.update(word + suffix for suffix in SUFFIXES)
+    if word.endswith("e"):
+        forms.update({word + "d", word + "r", word + "rs", word[:-1] + "ing"})
+    if word.endswith("y"):
+        forms.add(word[:-1] + "ies")
+    return forms
+
+
+class KeywordMatcher:
+    # Terms are stored as word tuples in one hash table (with simple
+    # inflections of the last word), so matching costs one lookup per word
+    # n-gram of the query no matter how many terms are loaded, and a term
+    # only ever matches whole words ("skill" does not contain "kill").
+    def __init__(self, terms=(), label=None, inflect: bool = True):
+        self.inflect = inflect
+        self.max_words = 1
+        self._phrases = {}
+        self._suffixes = {}
+        self._stems = {}
+        self.add(terms, label)
+
+    def add(self, terms, label=None) -> None:
+        for term in terms:
+            words = tuple(tokenize(term))
+            if not words:
+                continue
+            forms = _inflections(words[-1]) if self.inflect else {words[-1]}
+            for form in forms:
+                self._phrases.setdefault(words[:-1] + (form,), (term, label))
+            self.max_words = max(self.max_words, len(words))
+
+    def add_suffixes(self, suffixes, label=None) -> None:
+        # Matches a word that ends with the suffix after at least one more
+        # letter: "asana" catches "Ustrasana" but not the word "asana".
+        for suffix in suffixes:
+            self._suffixes.setdefault(suffix.lower(), (suffix, label))
+
+    def add_stems(self, stems, label=None) -> None:
+        # Matches a word containing the stem anywhere ("Suryanamaskar").
+        for stem in stems:
+            self._stems.setdefault(stem.lower(), (stem, label))
+
+    def _find_word_part(self, words):
+        for word in words:
+            for suffix, match in self._suffixes.items():
+                if len(word) > len(suffix) and word.endswith(suffix):
+                    return match
+            for stem, match in self._stems.items():
+                if stem in word:
+                    return match
+        return None
+
+    def add_file(self, path: str, label=None) -> None:
+        with open(path, "r", encoding="utf-8") as f:
+            self.add((line.split("#", 1)[0].strip() for line in f), label)
+
+    def find(self, text: str):
+        words = tokenize(text)
+        for start in range(len(words)):
+            for length in range(1, min(self.max_words, len(words) - start) + 1):
+                match = self._phrases.get(tuple(words[start:start + length]))
+                if match is not None:
+                    return match
+        if self._suffixes or self._stems:
+            return self._find_word_part(words)
+        return None
+
+    def __len__(self) -> int:
+        return len(self._phrases)
@@ -0,0 +1,187 @@
+import heapq
+import json
+import math
+import os
+import re
+
+from vector_index import EMBEDDING_MODEL_NAME, chunk_id, index_fingerprint
+
+
+LEXICAL_INDEX_FILENAME = "bm25.json"
+LEXICAL_INDEX_VERSION = 1
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "for", "in", "on", "is", "are",
+    "be", "it", "if", "you", "your", "with", "what", "which", "how", "do",
+    "does", "i", "me", "my", "can", "that", "this", "about", "tell",
+}
+
+# A query term counts as discriminating when it appears in at most about one
+# record in eight; exact pose names and contraindication phrases clear this.
+DECISIVE_MIN_IDF = 2.0
+
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs = {}
+        self.doc_len = {}
+        self.postings = {}
+        self.total_len = 0
+
+    @classmethod
+    def from_documents(cls, items, **kwargs):
+        index = cls(**kwargs)
+        for id_, text in items:
+            index.add(id_, text)
+        return index
+
+    def add(self, id_: str, text: str) -> None:
+        if id_ in self.docs:
+            return
+        tokens = tokenize(text)
+        self.docs[id_] = text
+        self.doc_len[id_] = len(tokens)
+        self.total_len += len(tokens)
+
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, tf in counts.items():
+            self.postings.setdefault(token, {})[id_] = tf
+
+    def remove(self, id_: str) -> None:
+        text = self.docs.pop(id_, None)
+        if text is None:
+            return
+        self.total_len -= self.doc_len.pop(id_)
+        for token in set(tokenize(text)):
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            posting.pop(id_, None)
+            if not posting:
+                del self.postings[token]
+
+    def updated(self, added: dict, removed) -> "BM25Index":
+        # Copy-on-write: searches keep using this index while the copy is
+        # edited. Only the postings of terms in changed documents are copied.
+        index = BM25Index(k1=self.k1, b=self.b)
+        index.docs = dict(self.docs)
+        index.doc_len = dict(self.doc_len)
+        index.total_len = self.total_len
+
+        touched = set()
+        for id_ in removed:
+            if id_ in self.docs:
+                touched.update(tokenize(self.docs[id_]))
+        for text in added.values():
+            touched.update(tokenize(text))
+        index.postings = {
+            term: dict(posting) if term in touched else posting
+            for term, posting in self.postings.items()
+        }
+
+        for id_ in removed:
+            index.remove(id_)
+        for id_, text in added.items():
+            index.add(id_, text)
+        return index
+
+    def idf(self, term: str) -> float:
+        n = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.docs) - n + 0.5) / (n + 0.5))
+
+    def search(self, query: str, k: int = 10) -> list[tuple[str, float]]:
+        if not self.docs:
+            return []
+
+        avg_len = self.total_len / len(self.docs)
+        scores = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = self.idf(term)
+            for id_, tf in posting.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[id_] / avg_len)
+                scores[id_] = scores.get(id_, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def is_decisive(self, query: str, hits, min_idf: float = DECISIVE_MIN_IDF) -> bool:
+        rare_terms = [
+            term for term in set(tokenize(query))
+            if term in self.postings and self.idf(term) >= min_idf
+        ]
+        if not rare_terms or not hits:
+            return False
+        return all(
+            id_ in self.postings[term]
+            for id_, _ in hits
+            for term in rare_terms
+        )
+
+    def save(self, path: str, fingerprint: str) -> None:
+        ids = list(self.docs)
+        positions = {id_: position for position, id_ in enumerate(ids)}
+        payload = {
+            "version": LEXICAL_INDEX_VERSION,
+            "fingerprint": fingerprint,
+            "k1": self.k1,
+            "b": self.b,
+            "ids": ids,
+            "texts": [self.docs[id_] for id_ in ids],
+            "doc_len": [self.doc_len[id_] for id_ in ids],
+            "postings": {
+                term: [[positions[id_], tf] for id_, tf in posting.items()]
+                for term, posting in self.postings.items()
+            },
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(payload))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, fingerprint: str):
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if payload.get("version") != LEXICAL_INDEX_VERSION or payload.get("fingerprint") != fingerprint:
+            return None
+
+        index = cls(k1=payload["k1"], b=payload["b"])
+        ids = payload["ids"]
+        index.docs = dict(zip(ids, payload["texts"]))
+        index.doc_len = dict(zip(ids, payload["doc_len"]))
+        index.total_len = sum(payload["doc_len"])
+        index.postings = {
+            term: {ids[position]: tf for position, tf in posting}
+            for term, posting in payload["postings"].items()
+        }
+        return index
+
+
+def load_or_build_lexical_index(chunks, persist_directory: str, model_name: str = EMBEDDING_MODEL_NAME) -> BM25Index:
+    items = {}
+    for chunk in chunks:
+        items.setdefault(chunk_id(chunk, model_name), chunk)
+    fingerprint = index_fingerprint(items)
+
+    path = os.path.join(persist_directory, LEXICAL_INDEX_FILENAME)
+    index = BM25Index.load(path, fingerprint)
+    if index is None:
+        index = BM25Index.from_documents(items.items())
+        os.makedirs(persist_directory, exist_ok=True)
+        index.save(path, fingerprint)
+    return index
@@ -0,0 +1,245 @@
+import json
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+METRICS_JSONL_PATH = os.getenv("YOGA_METRICS_JSONL", "")
+METRICS_PORT = int(os.getenv("YOGA_METRICS_PORT", "0"))
+METRICS_NAMESPACE = "yoga"
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192)
+RECENT_SAMPLES = 1024
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values, pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def summarize_ms(seconds) -> dict:
+    values = [s * 1000 for s in seconds]
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50), 3) if values else None,
+        "p95_ms": round(percentile(values, 95), 3) if values else None,
+        "p99_ms": round(percentile(values, 99), 3) if values else None,
+        "max_ms": round(max(values), 3) if values else None,
+    }
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+        self.recent.append(value)
+
+
+class Metrics:
+    def __init__(self, jsonl_path: str = METRICS_JSONL_PATH, namespace: str = METRICS_NAMESPACE):
+        self.namespace = namespace
+        self.jsonl_path = jsonl_path
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, buckets=LATENCY_BUCKETS, **labels) -> None:
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def trace(self, name: str) -> "Trace":
+        return Trace(self, name)
+
+    @contextmanager
+    def span(self, stage: str, **attributes):
+        started = time.perf_counter()
+        error = None
+        try:
+            yield attributes
+        except GeneratorExit:
+            # A consumer that stops reading a streamed answer is not an error.
+            raise
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe("stage_seconds", elapsed, stage=stage)
+            if error is not None:
+                self.inc("stage_errors_total", stage=stage, error=error)
+            attributes["duration_ms"] = round(elapsed * 1000, 3)
+            if error is not None:
+                attributes["error"] = error
+
+    def write_trace(self, record: dict) -> None:
+        if not self.jsonl_path:
+            return
+        line = json.dumps(record, default=str)
+        with self._lock:
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def latency_summary(self) -> dict:
+        with self._lock:
+            recent = {
+                dict(key).get("stage"): list(histogram.recent)
+                for (name, key), histogram in self.histograms.items()
+                if name == "stage_seconds"
+            }
+        return {stage: summarize_ms(samples) for stage, samples in sorted(recent.items())}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(key), "value": value}
+                for (name, key), value in sorted(self.counters.items())
+            ]
+        return {"counters": counters, "latency": self.latency_summary()}
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(
+                (key, list(h.counts), h.buckets, h.total, h.count) for key, h in self.histograms.items()
+            )
+
+        declared = set()
+        for (name, key), value in counters:
+            metric = f"{self.namespace}_{name}"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} counter")
+                declared.add(metric)
+            lines.append(f"{metric}{_format_labels(key)} {value:g}")
+
+        for (name, key), counts, buckets, total, count in histograms:
+            metric = f"{self.namespace}_{name}"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} histogram")
+                declared.add(metric)
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{metric}_bucket{_format_labels(key, (('le', f'{bound:g}'),))} {cumulative}")
+            lines.append(f"{metric}_bucket{_format_labels(key, (('le', '+Inf'),))} {count}")
+            lines.append(f"{metric}_sum{_format_labels(key)} {total:g}")
+            lines.append(f"{metric}_count{_format_labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+class Trace:
+    # The spans of one request. It is passed around explicitly rather than
+    # through a context variable because answers are produced by generators
+    # that may be resumed from different threads or tasks.
+    def __init__(self, metrics: Metrics, name: str):
+        self.metrics = metrics
+        self.name = name
+        self.record = {"trace_id": uuid.uuid4().hex[:16], "name": name, "started": time.time(), "spans": []}
+        self._started = time.perf_counter()
+        self._finished = False
+
+    @contextmanager
+    def span(self, stage: str, **attributes):
+        try:
+            with self.metrics.span(stage, **attributes) as span:
+                yield span
+        finally:
+            self.record["spans"].append({"stage": stage, **span})
+
+    def annotate(self, **attributes) -> None:
+        self.record.update(attributes)
+
+    def finish(self) -> None:
+        if self._finished:
+            return
+        self._finished = True
+        elapsed = time.perf_counter() - self._started
+        self.metrics.observe("stage_seconds", elapsed, stage=self.name)
+        self.record["duration_ms"] = round(elapsed * 1000, 3)
+        self.metrics.write_trace(self.record)
+
+
+METRICS = Metrics()
+
+
+def serve_prometheus(port: int = METRICS_PORT, host: str = "0.0.0.0", metrics: Metrics = METRICS):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="yoga-metrics", daemon=True).start()
+    return server
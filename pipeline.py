@@ -0,0 +1,677 @@
+import logging
+import os
+import re
+from contextlib import nullcontext
+from dotenv import load_dotenv
+from corpus import YOGA_DATA_PATH, iter_documents, load_pose_table
+from cache import CachedEmbeddings
+from context import build_context, count_tokens
+from embeddings import build_embeddings
+from embed_server import EMBED_SOCKET, EmbedClient, RemoteEmbeddings, RemoteVectorStore
+from facets import FacetIndex
+from generate_data import POSES
+from keywords import KeywordMatcher
+from lexical import load_or_build_lexical_index
+from metrics import METRICS, TOKEN_BUCKETS
+from resilience import LLM_TIMEOUT_SECONDS, CircuitBreaker, LLMTimeout, SingleFlight, prompt_key
+from retrieval import HybridRetriever
+from vector_index import CHROMA_DB_PATH, open_vector_store
+
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+HUGGINGFACE_API_TOKEN = os.getenv("HUGGINGFACE_API_TOKEN", "")
+RETRIEVAL_MODE = os.getenv("YOGA_RETRIEVAL_MODE", "hybrid")
+LLM_REPO_ID = "mistralai/Mistral-Large-Instruct-2411"
+# Both LLM clients (setup_llm and service.InferenceClient) call this URL.
+LLM_ENDPOINT_URL = os.getenv(
+    "YOGA_LLM_ENDPOINT_URL",
+    f"https://router.huggingface.co/hf-inference/models/{LLM_REPO_ID}"
+)
+LLM_GENERATION_KWARGS = {
+    "max_new_tokens": 1024,
+    "temperature": 0.1,
+    "top_p": 0.92,
+    "repetition_penalty": 1.1,
+}
+SAFETY_KEYWORDS_FILE = os.getenv("YOGA_SAFETY_KEYWORDS_FILE", "")
+TOPIC_KEYWORDS_FILE = os.getenv("YOGA_TOPIC_KEYWORDS_FILE", "")
+TOPIC_REJECTION_ANSWER = "I'm a yoga specialist! Please ask yoga-related questions.\n\nExamples: What is Downward Dog? Benefits of yoga? How to start?"
+
+
+SAFETY_BLOCKED_KEYWORDS = ["kill", "hurt", "harm", "weapon", "violence", "attack", "injure"]
+
+YOGA_KEYWORDS = [
+    "yoga", "pose", "asana", "pranayama", "meditation", "chakra",
+    "downward dog", "warrior", "lotus", "stretch", "flexibility",
+    "breathing", "mudra", "mantra", "namaste", "hatha", "vinyasa",
+    "yin yoga", "power yoga", "kundalini", "yogi", "asanas",
+    "alignment", "chakras", "benefits", "technique", "posture",
+    "flexibility", "strength", "balance", "relaxation", "stress relief",
+    "pigeon", "child pose", "corpse pose", "mountain pose", "tree pose",
+    "forward fold", "backbend", "hip opener", "sun salutation",
+    "drishti", "ujjayi", "padmasana", "trikonasana", "cobra", "bhujang"
+]
+
+
+HARMFUL_WORDS = ["suicide", "death", "kill"]
+
+GENERAL_YOGA_WORDS = ["how", "what", "why", "benefit", "help", "practice", "exercise", "health", "wellness", "fitness", "body", "mind"]
+
+POSE_NAME_TERMS = [
+    name.strip()
+    for pose in POSES
+    for name in re.split(r"[()]", pose)
+    if name.strip()
+]
+
+
+SANSKRIT_POSE_SUFFIXES = ["asana", "asanas"]
+SANSKRIT_STEMS = ["pranayam", "namaskar"]
+
+
+def build_safety_matcher(extra_keywords_file: str = SAFETY_KEYWORDS_FILE) -> KeywordMatcher:
+    matcher = KeywordMatcher(SAFETY_BLOCKED_KEYWORDS, label="keyword")
+    matcher.add(HARMFUL_WORDS, label="harmful")
+    if extra_keywords_file:
+        matcher.add_file(extra_keywords_file, label="keyword")
+    return matcher
+
+
+def build_topic_matcher(extra_keywords_file: str = TOPIC_KEYWORDS_FILE) -> KeywordMatcher:
+    matcher = KeywordMatcher(YOGA_KEYWORDS + POSE_NAME_TERMS + GENERAL_YOGA_WORDS)
+    # Sanskrit names outside the lists above ("Utkatasana", "Suryanamaskar").
+    matcher.add_suffixes(SANSKRIT_POSE_SUFFIXES)
+    matcher.add_stems(SANSKRIT_STEMS)
+    if extra_keywords_file:
+        matcher.add_file(extra_keywords_file)
+    return matcher
+
+
+SAFETY_MATCHER = build_safety_matcher()
+TOPIC_MATCHER = build_topic_matcher()
+POSE_NAME_MATCHER = KeywordMatcher(POSE_NAME_TERMS)
+# Sanskrit pose names outside POSES ("Bakasana", "Pincha Mayurasana").
+POSE_NAME_MATCHER.add_suffixes(SANSKRIT_POSE_SUFFIXES)
+LLM_BREAKER = CircuitBreaker()
+LLM_FLIGHTS = SingleFlight()
+
+
+def check_safety(query: str) -> tuple[bool, str]:
+    match = SAFETY_MATCHER.find(query)
+    if match is None:
+        return True, "Safe"
+    
+    keyword, label = match
+    if label == "harmful":
+        return False, "Query contains potentially harmful content"
+    return False, f"Blocked keyword: {keyword}"
+
+
+def is_yoga_question(query: str) -> bool:
+    return TOPIC_MATCHER.find(query) is not None
+
+
+def names_pose(query: str) -> bool:
+    return POSE_NAME_MATCHER.find(query) is not None
+
+
+YOGA_KNOWLEDGE = """
+YOGA FUNDAMENTALS
+
+What is Yoga?
+Yoga is an ancient practice from India that combines physical poses (asanas), breathing 
+exercises (pranayama), and meditation to improve physical, mental, and spiritual health.
+
+KEY BENEFITS OF YOGA:
+
+Physical Benefits:
+• Increased flexibility and range of motion
+• Stronger muscles and bones
+• Better balance and coordination
+• Improved cardiovascular health
+• Reduced chronic pain and stiffness
+
+Mental & Emotional Benefits:
+• Reduced stress and anxiety
+• Better focus and concentration
+• Improved sleep quality
+• Greater emotional balance
+• Increased self-awareness
+
+Spiritual Benefits:
+• Deeper mindfulness and awareness
+• Inner peace and tranquility
+• Connection to purpose
+• Enhanced spiritual growth
+
+POPULAR YOGA POSES:
+• Mountain Pose (Tadasana) - foundation pose, improves posture
+• Downward Dog (Adho Mukha Svanasana) - strengthens arms, calms mind
+• Warrior I & II (Virabhadrasana) - build strength and confidence
+• Child's Pose (Balasana) - promotes relaxation and calmness
+• Tree Pose (Vrksasana) - improves balance and focus
+• Lotus Pose (Padmasana) - opening pose for meditation
+• Forward Fold (Uttanasana) - stretches hamstrings, calms mind
+
+YOGA PRACTICE TIPS:
+• Practice 3-5 times per week for best results
+• Listen to your body - never force a pose
+• Breathe deeply and steadily (never hold your breath)
+• Warm up before attempting advanced poses
+• Combine poses with meditation and breathing exercises
+"""
+
+
+def setup_llm():
+    if not HUGGINGFACE_API_TOKEN:
+        return None
+    
+    try:
+        from langchain_huggingface import HuggingFaceEndpoint
+        
+        return HuggingFaceEndpoint(
+            endpoint_url=LLM_ENDPOINT_URL,
+            huggingfacehub_api_token=HUGGINGFACE_API_TOKEN,
+            timeout=LLM_TIMEOUT_SECONDS,
+            **LLM_GENERATION_KWARGS
+        )
+    except Exception:
+        return None
+
+
+def load_knowledge_base(data_path: str = YOGA_DATA_PATH, persist_directory: str = CHROMA_DB_PATH, stage=None) -> dict:
+    # `stage(name)` is an optional context manager wrapped around each step,
+    # used by the warm-up thread to report progress and timings.
+    stage = stage or (lambda name: nullcontext())
+    with stage("chunking"):
+        chunks = list(iter_documents(data_path))
+    if EMBED_SOCKET:
+        with stage("embedding server"):
+            client = EmbedClient(EMBED_SOCKET)
+            embeddings = CachedEmbeddings(RemoteEmbeddings(client))
+            server_stats = client.call("stats")
+        if server_stats["vector_store"]:
+            # The model and vector store live in embed_server.py, shared by
+            # every worker; this process keeps only the small in-memory indexes.
+            vector_db = RemoteVectorStore(client, embeddings)
+            index_stats = server_stats["index"]
+        else:
+            # An --embed-only server shares just the model, so the worker
+            # opens its own store and only sends embeddings to the server.
+            with stage("vector index"):
+                vector_db, index_stats = open_vector_store(
+                    chunks, embeddings, persist_directory, model_name=server_stats["model"]
+                )
+    else:
+        with stage("embedding model"):
+            embeddings = CachedEmbeddings(build_embeddings())
+        with stage("vector index"):
+            vector_db, index_stats = open_vector_store(chunks, embeddings, persist_directory)
+    with stage("lexical index"):
+        lexical_index = load_or_build_lexical_index(chunks, persist_directory)
+    with stage("pose index"):
+        pose_table = load_pose_table(data_path)
+        facet_index = FacetIndex(pose_table.items())
+    return {
+        "vector_db": vector_db,
+        "index_stats": index_stats,
+        "lexical_index": lexical_index,
+        "pose_table": pose_table,
+        "facet_index": facet_index,
+    }
+
+
+def generate_fallback_response(query: str) -> str:
+    query_lower = query.lower()
+    
+    if any(word in query_lower for word in ["benefit", "help", "good", "advantage"]):
+        return """Amazing Benefits of Yoga:
+
+Physical Benefits:
+• Increased flexibility and strength
+• Better balance and coordination
+• Improved cardiovascular health
+• Reduced chronic pain
+• Better posture and alignment
+
+Mental & Emotional:
+• Reduced stress and anxiety
+• Improved focus and concentration
+• Better sleep quality
+• Emotional stability and peace
+• Increased self-awareness
+
+Spiritual:
+• Deeper mindfulness
+• Inner peace and tranquility
+• Connection to purpose
+• Enhanced spiritual growth
+
+Practice Regularly: 3-5 times per week for best results. Consistency beats intensity!"""
+    
+    elif any(word in query_lower for word in ["pose", "asana"]):
+        if "downward dog" in query_lower:
+            return """Downward Dog (Adho Mukha Svanasana)
+
+What It Does:
+• Strengthens arms, shoulders, legs
+• Stretches hamstrings and calves
+• Improves blood circulation
+• Calms nervous system
+• Reduces stress
+
+How to Do It:
+1. Start on hands and knees
+2. Press palms firmly on ground
+3. Lift hips toward ceiling
+4. Create an inverted V-shape
+5. Head between arms, breathe deeply
+6. Hold 5-10 breaths
+
+Beginner Tips:
+• Bend your knees if needed
+• Don't lock elbows
+• Breathe deeply throughout
+
+Avoid If: You have wrist/shoulder injuries"""
+        else:
+            return """Common Yoga Poses:
+
+Standing: Mountain, Warrior I/II, Triangle - build strength
+Forward Bends: Forward Fold, Seated Fold - stretch & calm
+Backbends: Cobra, Wheel, Bridge - strengthen spine
+Hip Openers: Pigeon, Butterfly - increase flexibility
+Balance: Tree, Eagle - improve focus
+Rest: Child's Pose, Corpse - relax & restore
+
+Which pose interests you?"""
+    
+    elif any(word in query_lower for word in ["beginner", "start", "learn", "new"]):
+        return """Your Yoga Journey Starts Here!
+
+Week 1-2: Foundation
+• Practice 2-3 times per week
+• Learn: Mountain, Child's, Downward Dog
+• Focus on breathing
+• 20-30 minutes per session
+
+Essential Beginner Poses:
+• Mountain Pose - foundation
+• Child's Pose - rest & calm
+• Downward Dog - stretch & strengthen
+• Forward Fold - flexibility
+• Corpse Pose - final relaxation
+
+Important Tips:
+• Never force any pose
+• Listen to your body
+• Breathe deeply & steadily
+• Rest between poses
+• Wear comfortable clothes
+
+What You'll Feel:
+Week 2: Increased flexibility
+Week 3: Strength improvement
+Week 4+: Mental clarity & peace
+
+Consistency is key - start now!"""
+    
+    else:
+        return """Welcome to Your Yoga Assistant!
+
+I'm here to help with:
+• Yoga poses and how to do them
+• Benefits and health improvements
+• Breathing techniques
+• Meditation practices
+• Beginner guidance
+• Safety & precautions
+
+Try Asking:
+• "What is Downward Dog?"
+• "Benefits of yoga?"
+• "How to start yoga?"
+• "Poses for flexibility?"
+• "Breathing techniques?"
+
+Ask a yoga question and let's get started!"""
+
+
+def facet_documents(facet_match: dict, facet_index, pose_table, max_poses: int = 10, max_records: int = 3) -> list:
+    from langchain_core.documents import Document
+    
+    numbers = facet_match["numbers"]
+    filters = [f"{field}: {value}" for field, value in facet_match["include"]]
+    filters += [f"excluding {field}: {value}" for field, value in facet_match["exclude"]]
+    
+    by_pose = {}
+    for number in numbers:
+        by_pose.setdefault(facet_index.pose_name(number), []).append(number)
+    
+    lines = [f"Poses matching {'; '.join(filters)} ({len(numbers)} records):"]
+    for name, pose_numbers in list(by_pose.items())[:max_poses]:
+        records = ", ".join(f"#{n}" for n in pose_numbers[:5])
+        lines.append(f"• {name} - YOGA POSE {records}")
+    
+    docs = [Document(page_content="\n".join(lines), metadata={"pose_numbers": numbers})]
+    for number in numbers[:max_records]:
+        docs.append(Document(page_content=pose_table[number], metadata={"pose_number": number}))
+    return docs
+
+
+def record_route(route: str) -> None:
+    METRICS.inc("retrieval_route_total", route=route)
+
+
+def record_fallback(trace, reason: str) -> None:
+    METRICS.inc("fallback_total", reason=reason)
+    trace.annotate(fallback=reason)
+
+
+def llm_failure_reason(error: Exception) -> str:
+    return "llm_timeout" if isinstance(error, LLMTimeout) else "llm_error"
+
+
+# Only explicit references ("#12", "pose 12", "number 12") name a record;
+# bare numbers ("50 year olds", "10 minutes a day") are part of a question.
+POSE_NUMBER_PATTERN = re.compile(r'#\s*(\d+)|\bpose\s+#?\s*(\d+)|\bnumber\s+#?\s*(\d+)')
+
+
+def parse_pose_number(query: str) -> int | None:
+    pose_match = POSE_NUMBER_PATTERN.search(query.lower())
+    if pose_match:
+        return int(pose_match.group(1) or pose_match.group(2) or pose_match.group(3))
+    return None
+
+
+def structured_documents(query: str, pose_table=None, facet_index=None) -> tuple[str, list] | None:
+    # Record-number lookups and facet filters are answered from the pose
+    # table alone; None means the query needs a search.
+    from langchain_core.documents import Document
+    
+    pose_num = parse_pose_number(query)
+    if pose_table is not None and pose_num in pose_table:
+        return "pose_number", [Document(page_content=pose_table[pose_num], metadata={"pose_number": pose_num})]
+    
+    # A question about one pose ("Is Crow Pose suitable for beginners?")
+    # goes to search, so its answer is about that pose rather than every
+    # record that shares a facet value.
+    if pose_table is not None and facet_index is not None and not names_pose(query):
+        facet_match = facet_index.search(query)
+        if facet_match and facet_match["numbers"]:
+            return "facets", facet_documents(facet_match, facet_index, pose_table)
+    return None
+
+
+def search_query(query: str, pose_table=None) -> str:
+    pose_num = parse_pose_number(query)
+    if pose_num is not None and pose_table is None:
+        return f"YOGA POSE #{pose_num}"
+    return query
+
+
+# Default for `structured` below: the caller has not routed the query yet.
+# (None is a routing result: the query needs a search.)
+UNROUTED = object()
+
+
+def retrieve_documents(
+    query: str,
+    vector_db,
+    pose_table=None,
+    facet_index=None,
+    lexical_index=None,
+    structured=UNROUTED
+) -> list:
+    if structured is UNROUTED:
+        structured = structured_documents(query, pose_table, facet_index)
+    if structured is not None:
+        route, docs = structured
+        record_route(route)
+        return docs
+    
+    if lexical_index is not None:
+        record_route(RETRIEVAL_MODE)
+        retriever = HybridRetriever(vector_db, lexical_index, k=3, mode=RETRIEVAL_MODE)
+    else:
+        record_route("dense")
+        retriever = vector_db.as_retriever(
+            search_type="similarity",
+            search_kwargs={"k": 3}
+        )
+    return retriever.invoke(search_query(query, pose_table))
+
+
+def build_prompt(context: str, query: str) -> str:
+    return f"""You are an expert yoga instructor. Answer the user's question using ONLY the information provided in the context below. Do NOT make up information or reference other poses.
+
+CONTEXT (Use ONLY this information):
+{context}
+
+USER QUESTION: {query}
+
+INSTRUCTIONS:
+1. Answer using ONLY the context above
+2. If the context doesn't have the answer, say "I don't have specific information about that"
+3. Include the pose name (English & Sanskrit if available)
+4. List benefits, precautions, and techniques from the context
+5. Be clear and concise
+6. Do NOT mention other poses unless they are in the context
+
+Answer:"""
+
+
+def response_text(response) -> str:
+    if isinstance(response, dict):
+        for key in ['generated_text', 'text', 'output', 'answer']:
+            if key in response:
+                response = response[key]
+                break
+    return str(response).strip()
+
+
+def context_answer(context: str) -> str:
+    return f"Based on the yoga knowledge base:\n\n{context}"
+
+
+def finalize_answer(answer: str, context: str) -> tuple[str, bool]:
+    if not answer or len(answer) < 50:
+        return context_answer(context), False
+    if "i don't know" in answer.lower() or "i cannot" in answer.lower():
+        return context_answer(context), False
+    return answer, True
+
+
+class PreparedAnswer:
+    # The outcome of every step before the LLM call. `event` is set when
+    # the answer is already decided (blocked, off topic, cached, or a
+    # fallback) and is yielded as is; otherwise `prompt` is ready to send.
+    def __init__(self, event=None, docs=(), context: str = "", cache_key=None):
+        self.event = event
+        self.docs = docs
+        self.context = context
+        self.cache_key = cache_key
+        self.prompt = None
+        self.prompt_tokens = 0
+
+
+def prepare_answer(
+    query: str,
+    vector_db,
+    pose_table=None,
+    facet_index=None,
+    lexical_index=None,
+    answer_cache=None,
+    llm_available: bool = True,
+    breaker=None,
+    trace=None,
+    structured=UNROUTED
+) -> PreparedAnswer:
+    # The decision flow shared by iter_yoga_answer and the async service;
+    # only the LLM call itself differs between them. Synchronous, so the
+    # service runs it in a worker thread.
+    with trace.span("safety_gate"):
+        is_safe, reason = check_safety(query)
+    if not is_safe:
+        record_fallback(trace, "blocked")
+        return PreparedAnswer(("blocked", reason))
+
+    with trace.span("topic_gate"):
+        on_topic = is_yoga_question(query)
+    if not on_topic:
+        record_fallback(trace, "off_topic")
+        return PreparedAnswer(("result", {"answer": TOPIC_REJECTION_ANSWER, "sources": []}))
+
+    with trace.span("retrieval") as span:
+        docs = retrieve_documents(query, vector_db, pose_table, facet_index, lexical_index, structured)
+        span["documents"] = len(docs)
+
+    cache_key = None
+    if answer_cache is not None and docs:
+        cache_key = answer_cache.key(query, docs)
+        cached_answer = answer_cache.get(cache_key)
+        METRICS.inc("answer_cache_total", result="miss" if cached_answer is None else "hit")
+        if cached_answer is not None:
+            return PreparedAnswer(("result", {"answer": cached_answer, "sources": docs}), docs)
+
+    if not docs:
+        record_fallback(trace, "no_documents")
+        return PreparedAnswer(("result", {"answer": generate_fallback_response(query), "sources": docs}), docs)
+
+    context = build_context(docs, pose_table, facet_index=facet_index)
+    if not llm_available:
+        record_fallback(trace, "no_llm")
+        return PreparedAnswer(("result", {"answer": context_answer(context), "sources": docs}), docs, context)
+
+    # While the endpoint is failing, answer from the context right away
+    # instead of waiting out another timeout.
+    if breaker is not None and not breaker.allow():
+        record_fallback(trace, "circuit_open")
+        return PreparedAnswer(("result", {"answer": context_answer(context), "sources": docs}), docs, context)
+
+    prepared = PreparedAnswer(None, docs, context, cache_key)
+    prepared.prompt = build_prompt(context, query)
+    prepared.prompt_tokens = count_tokens(prepared.prompt)
+    METRICS.observe("prompt_tokens", prepared.prompt_tokens, buckets=TOKEN_BUCKETS)
+    return prepared
+
+
+def complete_answer(prepared: PreparedAnswer, response, trace, answer_cache=None) -> str:
+    answer, accepted = finalize_answer(response_text(response), prepared.context)
+    if not accepted:
+        record_fallback(trace, "rejected_answer")
+    elif prepared.cache_key is not None:
+        answer_cache.put(prepared.cache_key, answer)
+    return answer
+
+
+def failed_answer(prepared: PreparedAnswer, error: Exception, trace) -> str:
+    METRICS.inc("endpoint_errors_total", error=type(error).__name__)
+    record_fallback(trace, llm_failure_reason(error))
+    logger.warning("LLM call failed, answering from retrieved context: %r", error)
+    return context_answer(prepared.context)
+
+
+def iter_yoga_answer(
+    query: str,
+    vector_db,
+    llm,
+    pose_table=None,
+    facet_index=None,
+    lexical_index=None,
+    answer_cache=None,
+    stream: bool = False,
+    trace=None,
+    breaker=None,
+    flights=None,
+    structured=UNROUTED
+):
+    # Callers that want the per-stage timings of this answer pass their own
+    # trace and read `trace.record` once the generator is done. Callers with
+    # their own concurrency (batch runs, benchmarks) pass their own breaker
+    # and flights instead of sharing the module's, and callers that already
+    # routed the query pass structured_documents' result.
+    trace = trace or METRICS.trace("answer")
+    breaker = breaker or LLM_BREAKER
+    flights = flights or LLM_FLIGHTS
+    try:
+        prepared = prepare_answer(
+            query, vector_db, pose_table, facet_index, lexical_index,
+            answer_cache=answer_cache,
+            llm_available=llm is not None,
+            breaker=breaker,
+            trace=trace,
+            structured=structured
+        )
+        if prepared.event is not None:
+            yield prepared.event
+            return
+        
+        prompt = prepared.prompt
+        try:
+            # Identical prompts in flight at the same time share one call.
+            key = prompt_key(prompt, stream)
+            with trace.span("llm", prompt_tokens=prepared.prompt_tokens, stream=stream):
+                if stream:
+                    parts = []
+                    for token in flights.stream(key, lambda: llm.stream(prompt), breaker=breaker):
+                        parts.append(token)
+                        yield "token", token
+                    response = "".join(parts)
+                else:
+                    response = flights.call(key, lambda: llm.invoke(prompt), breaker=breaker)
+            answer = complete_answer(prepared, response, trace, answer_cache)
+        except Exception as e:
+            answer = failed_answer(prepared, e, trace)
+        
+        yield "result", {"answer": answer, "sources": prepared.docs}
+    finally:
+        trace.finish()
+
+
+def stream_yoga_answer(query: str, vector_db, llm, **kwargs):
+    return iter_yoga_answer(query, vector_db, llm, stream=True, **kwargs)
+
+
+def answer_yoga_question(
+    query: str,
+    vector_db,
+    llm,
+    pose_table=None,
+    facet_index=None,
+    lexical_index=None,
+    answer_cache=None,
+    breaker=None,
+    flights=None
+) -> dict:
+    for event, payload in iter_yoga_answer(
+        query, vector_db, llm,
+        pose_table=pose_table,
+        facet_index=facet_index,
+        lexical_index=lexical_index,
+        answer_cache=answer_cache,
+        breaker=breaker,
+        flights=flights
+    ):
+        if event == "blocked":
+            return {"answer": None, "blocked": payload, "sources": []}
+        if event == "result":
+            return payload
+
+
+def iter_fallback_answer(query: str):
+    # Needs no index, model or endpoint, so it can answer while the
+    # knowledge base is still warming up.
+    is_safe, reason = check_safety(query)
+    if not is_safe:
+        yield "blocked", reason
+        return
+    
+    if not is_yoga_question(query):
+        yield "result", {"answer": TOPIC_REJECTION_ANSWER, "sources": []}
+        return
+    
+    yield "result", {"answer": generate_fallback_response(query), "sources": []}
@@ -0,0 +1,361 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import METRICS
+
+
+LLM_TIMEOUT_SECONDS = float(os.getenv("YOGA_LLM_TIMEOUT", "30"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("YOGA_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("YOGA_BREAKER_RESET_SECONDS", "30"))
+LLM_WORKERS = int(os.getenv("YOGA_LLM_WORKERS", "8"))
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+class LLMTimeout(TimeoutError):
+    pass
+
+
+def prompt_key(prompt: str, stream: bool = False) -> str:
+    return hashlib.sha256(f"{int(stream)}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+class CircuitBreaker:
+    # Closed: calls go through. After `failure_threshold` consecutive
+    # failures it opens and callers skip the endpoint. Once `reset_timeout`
+    # has passed, one probe call is let through (half-open); its outcome
+    # closes the breaker or opens it for another period.
+    def __init__(
+        self,
+        name: str = "llm",
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = BREAKER_RESET_SECONDS,
+        clock=time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probe_started = None
+
+    def _transition(self, state: str) -> None:
+        if state != self.state:
+            self.state = state
+            METRICS.inc("circuit_breaker_transitions_total", breaker=self.name, state=state)
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == BREAKER_CLOSED:
+                return True
+            now = self._clock()
+            if self.state == BREAKER_OPEN and now - self.opened_at < self.reset_timeout:
+                return False
+            # A probe whose caller never reported back (a closed generator,
+            # a cache hit) must not hold the breaker half-open forever.
+            if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+                return False
+            self._transition(BREAKER_HALF_OPEN)
+            self._probe_started = now
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._probe_started = None
+            self._transition(BREAKER_CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == BREAKER_HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = self._clock()
+                self._probe_started = None
+                self._transition(BREAKER_OPEN)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "failures": self.failures}
+
+
+class _Flight:
+    # One upstream call shared by every caller with the same key. Streamed
+    # tokens are kept so callers that join late replay them from the start.
+    def __init__(self, changed, breaker=None):
+        self.changed = changed
+        self.breaker = breaker
+        self.judged = False
+        self.waiters = 0
+        self.abandoned = False
+        self.started_at = None
+        self.last_activity = None
+        self.tokens = []
+        self.done = False
+        self.result = None
+        self.error = None
+        self.task = None
+
+
+def _judge(flight: _Flight, failed: bool) -> None:
+    # Once per upstream call, however many callers shared it. The first
+    # caller to hit its deadline records the failure right away instead of
+    # waiting for the slow call to end; a late answer then changes nothing.
+    # Called with the flight's condition held.
+    if flight.judged or flight.breaker is None:
+        return
+    flight.judged = True
+    if failed:
+        flight.breaker.record_failure()
+    else:
+        flight.breaker.record_success()
+
+
+def _timeout_error(timeout: float) -> LLMTimeout:
+    return LLMTimeout(f"No response from the LLM endpoint within {timeout:g}s")
+
+
+def _busy_error(timeout: float) -> LLMTimeout:
+    # Not judged by the breaker: the endpoint was never called.
+    return LLMTimeout(f"No free LLM worker within {timeout:g}s")
+
+
+class SingleFlight:
+    # Concurrent calls with the same key share one upstream call. Calls run
+    # on a worker pool so each caller can give up at its own deadline while
+    # the shared call finishes for the others. A caller waits at most
+    # `timeout` for a worker to pick the call up; once it starts, a stream's
+    # deadline applies to its first token and to each gap between tokens.
+    # A queued call every caller gave up on is dropped, never sent.
+    def __init__(self, max_workers: int = LLM_WORKERS, timeout: float = LLM_TIMEOUT_SECONDS):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="yoga-llm")
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._streams = {}
+
+    def _forget(self, flights: dict, key: str, flight: _Flight) -> None:
+        with self._lock:
+            if flights.get(key) is flight:
+                del flights[key]
+
+    def _join(self, flights: dict, key: str, fn, timeout: float, breaker, stream: bool) -> _Flight:
+        with self._lock:
+            flight = flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = flights[key] = _Flight(threading.Condition(), breaker)
+                self._executor.submit(self._run, flights, key, flight, fn, timeout, stream)
+            flight.waiters += 1
+        METRICS.inc("llm_calls_total", role="leader" if leader else "coalesced")
+        return flight
+
+    def _abandon(self, flights: dict, key: str, flight: _Flight) -> None:
+        with self._lock:
+            flight.waiters -= 1
+            if flight.waiters == 0 and flight.started_at is None:
+                flight.abandoned = True
+                if flights.get(key) is flight:
+                    del flights[key]
+
+    def _run(self, flights: dict, key: str, flight: _Flight, fn, timeout: float, stream: bool) -> None:
+        changed = flight.changed
+        with self._lock:
+            if flight.abandoned:
+                return
+            flight.started_at = flight.last_activity = time.monotonic()
+        with changed:
+            changed.notify_all()
+        result, error, stalled = None, None, False
+        try:
+            if stream:
+                for token in fn():
+                    with changed:
+                        now = time.monotonic()
+                        stalled = stalled or now - flight.last_activity > timeout
+                        flight.last_activity = now
+                        flight.tokens.append(token)
+                        changed.notify_all()
+            else:
+                result = fn()
+        except Exception as e:
+            error = e
+        finally:
+            stalled = stalled or time.monotonic() - flight.last_activity > timeout
+            self._forget(flights, key, flight)
+            with changed:
+                _judge(flight, error is not None or stalled)
+                flight.result, flight.error, flight.done = result, error, True
+                changed.notify_all()
+
+    def _wait(self, flights: dict, key: str, flight: _Flight, position: int, timeout: float, queued_until: float) -> tuple[list, bool]:
+        with flight.changed:
+            while position >= len(flight.tokens) and not flight.done:
+                now = time.monotonic()
+                if flight.started_at is None:
+                    if now >= queued_until:
+                        break
+                    flight.changed.wait(queued_until - now)
+                    continue
+                remaining = flight.last_activity + timeout - now
+                if remaining <= 0:
+                    _judge(flight, True)
+                    raise _timeout_error(timeout)
+                flight.changed.wait(remaining)
+            else:
+                return flight.tokens[position:], flight.done
+        self._abandon(flights, key, flight)
+        METRICS.inc("llm_busy_total")
+        raise _busy_error(timeout)
+
+    def call(self, key: str, fn, timeout: float | None = None, breaker=None):
+        timeout = self.timeout if timeout is None else timeout
+        queued_until = time.monotonic() + timeout
+        flight = self._join(self._calls, key, fn, timeout, breaker, stream=False)
+        self._wait(self._calls, key, flight, 0, timeout, queued_until)
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def stream(self, key: str, iterator_fn, timeout: float | None = None, breaker=None):
+        timeout = self.timeout if timeout is None else timeout
+        queued_until = time.monotonic() + timeout
+        flight = self._join(self._streams, key, iterator_fn, timeout, breaker, stream=True)
+        position = 0
+        while True:
+            tokens, finished = self._wait(self._streams, key, flight, position, timeout, queued_until)
+            for token in tokens:
+                yield token
+            position += len(tokens)
+            if finished and position >= len(flight.tokens):
+                if flight.error is not None:
+                    raise flight.error
+                return
+
+
+class AsyncSingleFlight:
+    # asyncio counterpart of SingleFlight for the answer service. The shared
+    # call runs as its own task, so a caller timing out or disconnecting
+    # never cancels it for the others. Leaders queue for one of
+    # `max_concurrency` endpoint slots; followers wait on the leader instead
+    # of taking a slot. Callers wait at most `timeout` for the slot, and
+    # the upstream deadlines start once it is acquired.
+    def __init__(self, timeout: float = LLM_TIMEOUT_SECONDS, max_concurrency: int | None = None):
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self._calls = {}
+        self._streams = {}
+
+    def _forget(self, flights: dict, key: str, flight: _Flight) -> None:
+        if flights.get(key) is flight:
+            del flights[key]
+
+    def _join(self, flights: dict, key: str, fn, timeout: float, breaker, stream: bool) -> _Flight:
+        flight = flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = flights[key] = _Flight(asyncio.Condition(), breaker)
+            flight.task = asyncio.ensure_future(self._run(flights, key, flight, fn, timeout, stream))
+        flight.waiters += 1
+        METRICS.inc("llm_calls_total", role="leader" if leader else "coalesced")
+        return flight
+
+    def _abandon(self, flights: dict, key: str, flight: _Flight) -> None:
+        flight.waiters -= 1
+        if flight.waiters == 0 and flight.started_at is None:
+            flight.abandoned = True
+            self._forget(flights, key, flight)
+
+    async def _acquire(self) -> None:
+        if self._slots is not None:
+            with METRICS.span("queue"):
+                await self._slots.acquire()
+
+    async def _run(self, flights: dict, key: str, flight: _Flight, fn, timeout: float, stream: bool) -> None:
+        changed = flight.changed
+        result, error, stalled = None, None, False
+        await self._acquire()
+        if flight.abandoned:
+            if self._slots is not None:
+                self._slots.release()
+            return
+        try:
+            async with changed:
+                flight.started_at = flight.last_activity = time.monotonic()
+                changed.notify_all()
+            if stream:
+                async for token in fn():
+                    async with changed:
+                        now = time.monotonic()
+                        stalled = stalled or now - flight.last_activity > timeout
+                        flight.last_activity = now
+                        flight.tokens.append(token)
+                        changed.notify_all()
+            else:
+                result = await fn()
+        except Exception as e:
+            error = e
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+            stalled = stalled or time.monotonic() - flight.last_activity > timeout
+            self._forget(flights, key, flight)
+            async with changed:
+                _judge(flight, error is not None or stalled)
+                flight.result, flight.error, flight.done = result, error, True
+                changed.notify_all()
+
+    async def _wait(self, flights: dict, key: str, flight: _Flight, position: int, timeout: float, queued_until: float) -> tuple[list, bool]:
+        async with flight.changed:
+            while position >= len(flight.tokens) and not flight.done:
+                now = time.monotonic()
+                if flight.started_at is None:
+                    if now >= queued_until:
+                        break
+                    remaining = queued_until - now
+                else:
+                    remaining = flight.last_activity + timeout - now
+                    if remaining <= 0:
+                        _judge(flight, True)
+                        raise _timeout_error(timeout)
+                try:
+                    await asyncio.wait_for(flight.changed.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                return flight.tokens[position:], flight.done
+        self._abandon(flights, key, flight)
+        METRICS.inc("llm_busy_total")
+        raise _busy_error(timeout)
+
+    async def call(self, key: str, coro_fn, timeout: float | None = None, breaker=None):
+        timeout = self.timeout if timeout is None else timeout
+        queued_until = time.monotonic() + timeout
+        flight = self._join(self._calls, key, coro_fn, timeout, breaker, stream=False)
+        await self._wait(self._calls, key, flight, 0, timeout, queued_until)
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    async def stream(self, key: str, iterator_fn, timeout: float | None = None, breaker=None):
+        timeout = self.timeout if timeout is None else timeout
+        queued_until = time.monotonic() + timeout
+        flight = self._join(self._streams, key, iterator_fn, timeout, breaker, stream=True)
+        position = 0
+        while True:
+            tokens, finished = await self._wait(self._streams, key, flight, position, timeout, queued_until)
+            for token in tokens:
+                yield token
+            position += len(tokens)
+            if finished and position >= len(flight.tokens):
+                if flight.error is not None:
+                    raise flight.error
+                return
@@ -0,0 +1,75 @@
+from metrics import METRICS
+from vector_index import EMBEDDING_MODEL_NAME, chunk_id
+
+
+RETRIEVAL_MODES = ("dense", "hybrid", "lexical_first")
+RRF_K = 60
+DENSE_CANDIDATES = 10
+
+
+def reciprocal_rank_fusion(rankings, k: int = RRF_K) -> list[tuple[str, float]]:
+    scores = {}
+    for ranking in rankings:
+        for rank, id_ in enumerate(ranking, start=1):
+            scores[id_] = scores.get(id_, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridRetriever:
+    def __init__(
+        self,
+        vector_db,
+        lexical_index,
+        k: int = 3,
+        mode: str = "hybrid",
+        candidates: int = DENSE_CANDIDATES,
+        model_name: str = EMBEDDING_MODEL_NAME,
+    ):
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {mode}")
+        self.vector_db = vector_db
+        self.lexical_index = lexical_index
+        self.k = k
+        self.mode = mode
+        self.candidates = max(candidates, k)
+        self.model_name = model_name
+
+    def _lexical_document(self, id_: str, source: str):
+        from langchain_core.documents import Document
+
+        return Document(
+            page_content=self.lexical_index.docs[id_],
+            metadata={"chunk_id": id_, "retrieval": source}
+        )
+
+    def invoke(self, query: str) -> list:
+        if self.mode == "dense":
+            with METRICS.span("vector_search"):
+                return self.vector_db.similarity_search(query, k=self.k)
+
+        with METRICS.span("lexical_search"):
+            lexical_hits = self.lexical_index.search(query, self.candidates)
+        top_hits = lexical_hits[:self.k]
+        if self.mode == "lexical_first" and self.lexical_index.is_decisive(query, top_hits):
+            return [self._lexical_document(id_, "lexical") for id_, _ in top_hits]
+
+        dense_docs = {}
+        with METRICS.span("vector_search"):
+            dense_hits = self.vector_db.similarity_search(query, k=self.candidates)
+        for doc in dense_hits:
+            dense_docs.setdefault(chunk_id(doc.page_content, self.model_name), doc)
+
+        fused = reciprocal_rank_fusion([
+            [id_ for id_, _ in lexical_hits],
+            list(dense_docs),
+        ])
+
+        docs = []
+        for id_, score in fused[:self.k]:
+            if id_ in self.lexical_index.docs:
+                doc = self._lexical_document(id_, "hybrid")
+            else:
+                doc = dense_docs[id_]
+            doc.metadata["rrf_score"] = score
+            docs.append(doc)
+        return docs
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import os
+import queue
+import threading
+
+from metrics import METRICS
+from pipeline import (
+    HUGGINGFACE_API_TOKEN,
+    LLM_ENDPOINT_URL,
+    LLM_GENERATION_KWARGS,
+    complete_answer,
+    failed_answer,
+    prepare_answer,
+    response_text,
+)
+from resilience import LLM_TIMEOUT_SECONDS, AsyncSingleFlight, CircuitBreaker, prompt_key
+
+
+SERVICE_CONCURRENCY = int(os.getenv("YOGA_SERVICE_CONCURRENCY", "8"))
+SERVICE_MAX_PENDING = int(os.getenv("YOGA_SERVICE_MAX_PENDING", "64"))
+
+
+class ServiceOverloaded(Exception):
+    pass
+
+
+class InferenceClient:
+    def __init__(
+        self,
+        endpoint_url: str = LLM_ENDPOINT_URL,
+        token: str = HUGGINGFACE_API_TOKEN,
+        max_connections: int = SERVICE_CONCURRENCY,
+        timeout: float = LLM_TIMEOUT_SECONDS,
+        generation_kwargs: dict | None = None,
+    ):
+        import httpx
+        
+        self.endpoint_url = endpoint_url
+        self.parameters = {**LLM_GENERATION_KWARGS, **(generation_kwargs or {}), "return_full_text": False}
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self._client = httpx.AsyncClient(
+            headers=headers,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            )
+        )
+
+    async def generate(self, prompt: str) -> str:
+        response = await self._client.post(
+            self.endpoint_url,
+            json={"inputs": prompt, "parameters": self.parameters}
+        )
+        response.raise_for_status()
+        payload = response.json()
+        if isinstance(payload, list):
+            payload = payload[0] if payload else ""
+        return response_text(payload)
+
+    async def stream(self, prompt: str):
+        async with self._client.stream(
+            "POST",
+            self.endpoint_url,
+            json={"inputs": prompt, "parameters": self.parameters, "stream": True}
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                payload = json.loads(line[len("data:"):])
+                token = payload.get("token") or {}
+                if token.get("special"):
+                    continue
+                if token.get("text"):
+                    yield token["text"]
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+class YogaAnswerService:
+    def __init__(
+        self,
+        knowledge: dict,
+        llm_client=None,
+        max_concurrency: int = SERVICE_CONCURRENCY,
+        max_pending: int = SERVICE_MAX_PENDING,
+        answer_cache=None,
+        breaker=None,
+        llm_timeout: float = LLM_TIMEOUT_SECONDS,
+    ):
+        self.knowledge = knowledge
+        self.llm_client = llm_client
+        self.max_pending = max_pending
+        self.answer_cache = answer_cache
+        self.breaker = breaker or CircuitBreaker()
+        # Only the leader of a coalesced call takes one of the endpoint
+        # slots, so requests waiting on someone else's identical prompt do
+        # not hold back other prompts.
+        self._flights = AsyncSingleFlight(llm_timeout, max_concurrency)
+        self._pending = 0
+
+    async def events(self, query: str, stream: bool = False):
+        # The knowledge dict may be replaced by a hot reload mid-request; one
+        # request always reads a single version of it.
+        knowledge = self.knowledge
+        trace = METRICS.trace("answer")
+        try:
+            prepared = await asyncio.to_thread(
+                prepare_answer,
+                query,
+                knowledge["vector_db"],
+                knowledge.get("pose_table"),
+                knowledge.get("facet_index"),
+                knowledge.get("lexical_index"),
+                answer_cache=self.answer_cache,
+                llm_available=self.llm_client is not None,
+                breaker=self.breaker,
+                trace=trace
+            )
+            if prepared.event is not None:
+                yield prepared.event
+                return
+
+            # Requests queue on the endpoint slots up to max_pending; past that
+            # the service sheds load instead of piling more work on the endpoint.
+            if self._pending >= self.max_pending:
+                METRICS.inc("overloaded_total")
+                raise ServiceOverloaded(f"{self._pending} requests already waiting for the LLM endpoint")
+
+            self._pending += 1
+            prompt = prepared.prompt
+            try:
+                key = prompt_key(prompt, stream)
+                with trace.span("llm", prompt_tokens=prepared.prompt_tokens, stream=stream):
+                    if stream:
+                        parts = []
+                        tokens = self._flights.stream(key, lambda: self.llm_client.stream(prompt), breaker=self.breaker)
+                        async for token in tokens:
+                            parts.append(token)
+                            yield "token", token
+                        raw = "".join(parts)
+                    else:
+                        raw = await self._flights.call(
+                            key, lambda: self.llm_client.generate(prompt), breaker=self.breaker
+                        )
+                answer = complete_answer(prepared, raw, trace, self.answer_cache)
+            except Exception as e:
+                answer = failed_answer(prepared, e, trace)
+            finally:
+                self._pending -= 1
+
+            yield "result", {"answer": answer, "sources": prepared.docs}
+        finally:
+            trace.finish()
+
+    async def answer(self, query: str) -> dict:
+        async for event, payload in self.events(query):
+            if event == "blocked":
+                return {"answer": None, "blocked": payload, "sources": []}
+            if event == "result":
+                return payload
+
+    async def aclose(self) -> None:
+        if self.llm_client is not None:
+            await self.llm_client.aclose()
+
+
+class ServiceRunner:
+    def __init__(self, service_factory):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="yoga-answer-service", daemon=True)
+        self._thread.start()
+        self.service = self.run(self._create(service_factory))
+
+    async def _create(self, service_factory):
+        return service_factory()
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def answer(self, query: str) -> dict:
+        return self.run(self.service.answer(query))
+
+    def events(self, query: str, stream: bool = True):
+        events = queue.Queue()
+        done = object()
+
+        async def pump():
+            try:
+                async for event in self.service.events(query, stream=stream):
+                    events.put(event)
+            except Exception as e:
+                events.put(("error", e))
+            finally:
+                events.put(done)
+
+        asyncio.run_coroutine_threadsafe(pump(), self.loop)
+        while True:
+            event = events.get()
+            if event is done:
+                return
+            if event[0] == "error":
+                raise event[1]
+            yield event
+
+    def close(self) -> None:
+        self.run(self.service.aclose())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
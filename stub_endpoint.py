@@ -0,0 +1,124 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+STUB_HOST = "127.0.0.1"
+STUB_PORT = 8765
+
+
+def stub_answer(prompt: str) -> str:
+    match = re.search(r"CONTEXT \(Use ONLY this information\):\n(.*?)\n\nUSER QUESTION:", prompt, re.S)
+    context = match.group(1).strip() if match else prompt.strip()
+    first_line = context.splitlines()[0] if context else "the yoga knowledge base"
+    return f"According to the yoga knowledge base, {first_line}. Practice mindfully and respect the listed precautions."
+
+
+class StubLLM:
+    # In-process stand-in for HuggingFaceEndpoint with the same invoke/stream
+    # surface, for benchmarks that should not pay for HTTP. `calls` counts
+    # upstream calls so coalescing can be checked.
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            raise RuntimeError("Stub endpoint failure")
+        return stub_answer(prompt)
+
+    def stream(self, prompt: str):
+        for word in self.invoke(prompt).split(" "):
+            yield word + " "
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    token_delay = 0.0
+    failure_rate = 0.0
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        answer = stub_answer(request.get("inputs", ""))
+        time.sleep(self.latency)
+
+        if random.random() < self.failure_rate:
+            body = json.dumps({"error": "Service unavailable"}).encode("utf-8")
+            self.send_response(503)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        if request.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for word in answer.split(" "):
+                event = {"token": {"text": word + " ", "special": False}}
+                self.wfile.write(f"data:{json.dumps(event)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(self.token_delay)
+            self.close_connection = True
+            return
+
+        body = json.dumps([{"generated_text": answer}]).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(
+    host: str = STUB_HOST,
+    port: int = STUB_PORT,
+    latency: float = 0.0,
+    token_delay: float = 0.0,
+    failure_rate: float = 0.0,
+):
+    handler = type(
+        "ConfiguredStubHandler",
+        (StubHandler,),
+        {"latency": latency, "token_delay": token_delay, "failure_rate": failure_rate}
+    )
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the text-generation inference endpoint.")
+    parser.add_argument("--host", default=STUB_HOST)
+    parser.add_argument("--port", type=int, default=STUB_PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before answering")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed tokens")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of requests answered with a 503")
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.latency, args.token_delay, args.failure_rate)
+    print(f"Stub endpoint listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
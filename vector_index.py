@@ -0,0 +1,266 @@
+import hashlib
+import json
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from embeddings import EMBEDDING_MODEL_NAME, embedding_identity
+
+
+CHROMA_DB_PATH = "./chroma_db"
+COLLECTION_NAME = "yoga_knowledge"
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 1
+WRITE_BATCH_SIZE = 256
+VECTOR_BACKEND = os.getenv("YOGA_VECTOR_BACKEND", "chroma")
+FLAT_INDEX_DTYPE = os.getenv("YOGA_FLAT_INDEX_DTYPE", "float16")
+
+
+class EmbeddingMismatchError(ValueError):
+    pass
+
+
+def chunk_id(chunk: str, model_name: str = EMBEDDING_MODEL_NAME) -> str:
+    digest = hashlib.sha256()
+    digest.update(model_name.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(chunk.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def index_fingerprint(ids) -> str:
+    digest = hashlib.sha256()
+    for id_ in sorted(ids):
+        digest.update(id_.encode("ascii"))
+    return digest.hexdigest()
+
+
+def load_manifest(persist_directory: str) -> dict | None:
+    path = os.path.join(persist_directory, MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(persist_directory: str, manifest: dict) -> None:
+    os.makedirs(persist_directory, exist_ok=True)
+    path = os.path.join(persist_directory, MANIFEST_FILENAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(manifest))
+    os.replace(tmp_path, path)
+
+
+def stored_embedding_identity(path: str) -> str | None:
+    # The flat and HNSW backends record the embedding identity in meta.json.
+    try:
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            return json.load(f).get("model")
+    except (OSError, ValueError):
+        return None
+
+
+def check_embedding_identity(stored: str | None, expected: str, where: str, allow_rebuild: bool = False) -> None:
+    # Vectors from different backends or models are not comparable, so an
+    # index is never silently re-embedded or queried with the wrong model.
+    if stored is None or stored == expected or allow_rebuild:
+        return
+    raise EmbeddingMismatchError(
+        f"{where} was built with {stored!r} embeddings but {expected!r} is configured. "
+        f"Set YOGA_EMBEDDING_BACKEND to match, or rebuild with `python ingest.py --rebuild`."
+    )
+
+
+def _existing_ids(db, manifest: dict | None, model_name: str, collection_name: str) -> set[str]:
+    # The manifest lets an unchanged restart skip reading every id back out
+    # of Chroma; it is only trusted while it still agrees with the collection.
+    if (
+        manifest is not None
+        and manifest.get("model") == model_name
+        and manifest.get("collection") == collection_name
+        and len(manifest.get("ids", [])) == db._collection.count()
+    ):
+        return set(manifest["ids"])
+    return set(db.get(include=[])["ids"])
+
+
+def sync_vector_database(
+    chunks,
+    embeddings,
+    persist_directory: str,
+    collection_name: str = COLLECTION_NAME,
+    model_name: str = EMBEDDING_MODEL_NAME,
+    batch_size: int = WRITE_BATCH_SIZE,
+    workers: int = 1,
+    on_batch=None,
+    allow_rebuild: bool = False,
+):
+    from langchain_community.vectorstores import Chroma
+
+    db = Chroma(
+        collection_name=collection_name,
+        embedding_function=embeddings,
+        persist_directory=persist_directory
+    )
+
+    manifest = load_manifest(persist_directory)
+    if manifest is not None and manifest.get("collection") == collection_name:
+        stored_model = manifest.get("model")
+    else:
+        sample = db._collection.get(limit=1, include=["metadatas"])["metadatas"]
+        stored_model = sample[0].get("model") if sample and sample[0] else None
+    check_embedding_identity(stored_model, model_name, f"Collection {collection_name!r}", allow_rebuild)
+    existing = _existing_ids(db, manifest, model_name, collection_name)
+
+    def embed_batch(batch):
+        return batch, embeddings.embed_documents([text for _, text in batch])
+
+    def write_batch(future) -> int:
+        batch, vectors = future.result()
+        db._collection.upsert(
+            ids=[id_ for id_, _ in batch],
+            embeddings=vectors,
+            documents=[text for _, text in batch],
+            metadatas=[{"model": model_name} for _ in batch]
+        )
+        if on_batch is not None:
+            on_batch(len(batch))
+        return len(batch)
+
+    seen = set()
+    added = 0
+    pending = deque()
+    batch = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for chunk in chunks:
+            id_ = chunk_id(chunk, model_name)
+            if id_ in seen:
+                continue
+            seen.add(id_)
+            if id_ in existing:
+                continue
+
+            batch.append((id_, chunk))
+            if len(batch) >= batch_size:
+                pending.append(pool.submit(embed_batch, batch))
+                batch = []
+                # Keep at most two batches per worker in flight so memory
+                # stays bounded however large the corpus is.
+                while len(pending) >= 2 * max(1, workers):
+                    added += write_batch(pending.popleft())
+
+        if batch:
+            pending.append(pool.submit(embed_batch, batch))
+        while pending:
+            added += write_batch(pending.popleft())
+
+    stale = sorted(existing - seen)
+    for start in range(0, len(stale), batch_size):
+        db.delete(ids=stale[start:start + batch_size])
+
+    ids = sorted(seen)
+    fingerprint = index_fingerprint(ids)
+    if added or stale or manifest is None or manifest.get("fingerprint") != fingerprint:
+        save_manifest(persist_directory, {
+            "version": MANIFEST_VERSION,
+            "model": model_name,
+            "collection": collection_name,
+            "fingerprint": fingerprint,
+            "ids": ids,
+        })
+
+    return db, {"added": added, "deleted": len(stale), "total": len(ids), "fingerprint": fingerprint}
+
+
+def open_vector_store(chunks, embeddings, persist_directory: str = CHROMA_DB_PATH, backend: str = VECTOR_BACKEND, **kwargs):
+    kwargs.setdefault("model_name", embedding_identity())
+    if backend == "chroma":
+        return sync_vector_database(chunks, embeddings, persist_directory, **kwargs)
+    if backend == "flat":
+        from flat_index import FLAT_INDEX_DIRNAME, FlatVectorStore
+        kwargs.pop("workers", None)
+        kwargs.pop("on_batch", None)
+        path = os.path.join(persist_directory, FLAT_INDEX_DIRNAME)
+        return FlatVectorStore.sync(chunks, embeddings, path, dtype=FLAT_INDEX_DTYPE, **kwargs)
+    if backend == "hnsw":
+        from ann_index import ANN_INDEX_DIRNAME, HnswVectorStore
+        kwargs.pop("workers", None)
+        kwargs.pop("on_batch", None)
+        path = os.path.join(persist_directory, ANN_INDEX_DIRNAME)
+        return HnswVectorStore.sync(chunks, embeddings, path, **kwargs)
+    raise ValueError(f"Unknown vector backend: {backend}")
+
+
+def apply_vector_changes(vector_db, upserts: dict, deletes, backend: str = VECTOR_BACKEND, model_name: str | None = None):
+    # Returns the store to publish: Chroma and HNSW change in place, the
+    # flat backend returns an updated copy.
+    if backend != "chroma":
+        return vector_db.apply_changes(upserts, deletes)
+
+    model_name = model_name or embedding_identity()
+    if upserts:
+        texts = list(upserts.values())
+        vector_db._collection.upsert(
+            ids=list(upserts),
+            embeddings=vector_db.embeddings.embed_documents(texts),
+            documents=texts,
+            metadatas=[{"model": model_name} for _ in texts]
+        )
+    if deletes:
+        vector_db.delete(ids=list(deletes))
+    return vector_db
+
+
+def similarity_search_batch(vector_db, vectors, k: int = 4) -> list[list]:
+    # One search call for many query vectors: a single matrix product for
+    # the flat backend, one knn_query for HNSW and one collection query for
+    # Chroma. Other stores (the embedding server) are searched one by one.
+    vectors = list(vectors)
+    if not vectors:
+        return []
+    if hasattr(vector_db, "similarity_search_by_vectors"):
+        return vector_db.similarity_search_by_vectors(vectors, k)
+    if hasattr(vector_db, "_collection"):
+        from langchain_core.documents import Document
+
+        result = vector_db._collection.query(
+            query_embeddings=vectors,
+            n_results=k,
+            include=["documents", "metadatas"]
+        )
+        return [
+            [Document(page_content=text, metadata=metadata or {}) for text, metadata in zip(texts, metadatas)]
+            for texts, metadatas in zip(result["documents"], result["metadatas"])
+        ]
+    return [vector_db.similarity_search_by_vector(vector, k=k) for vector in vectors]
+
+
+def save_vector_changes(
+    vector_db,
+    ids,
+    persist_directory: str = CHROMA_DB_PATH,
+    backend: str = VECTOR_BACKEND,
+    model_name: str | None = None,
+    collection_name: str = COLLECTION_NAME,
+) -> None:
+    if backend != "chroma":
+        vector_db.save()
+        return
+
+    ids = sorted(ids)
+    save_manifest(persist_directory, {
+        "version": MANIFEST_VERSION,
+        "model": model_name or embedding_identity(),
+        "collection": collection_name,
+        "fingerprint": index_fingerprint(ids),
+        "ids": ids,
+    })
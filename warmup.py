@@ -0,0 +1,69 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+WARMUP_PENDING = "pending"
+WARMUP_LOADING = "loading"
+WARMUP_READY = "ready"
+WARMUP_FAILED = "failed"
+
+
+class WarmupState:
+    def __init__(self, loader, clock=time.perf_counter):
+        self.loader = loader
+        self.status = WARMUP_PENDING
+        self.stage_name = None
+        self.timings = {}
+        self.resources = None
+        self.error = None
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = None
+
+    def start(self) -> "WarmupState":
+        with self._lock:
+            if self._thread is None:
+                self._started = self._clock()
+                self._thread = threading.Thread(target=self._run, name="yoga-warmup", daemon=True)
+                self._thread.start()
+        return self
+
+    @contextmanager
+    def stage(self, name: str):
+        self.stage_name = name
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self.timings[name] = self._clock() - started
+
+    def _run(self) -> None:
+        self.status = WARMUP_LOADING
+        try:
+            self.resources = self.loader(self)
+            self.status = WARMUP_READY
+        except Exception as e:
+            self.error = e
+            self.status = WARMUP_FAILED
+        finally:
+            self.timings["total"] = self._clock() - self._started
+            self.stage_name = None
+            self._done.set()
+
+    @property
+    def ready(self) -> bool:
+        return self.status == WARMUP_READY
+
+    def wait(self, timeout: float | None = None) -> bool:
+        self._done.wait(timeout)
+        return self.ready
+
+    def snapshot(self) -> dict:
+        return {
+            "status": self.status,
+            "stage": self.stage_name,
+            "timings_ms": {name: round(seconds * 1000, 1) for name, seconds in self.timings.items()},
+            "error": str(self.error) if self.error is not None else None,
+        }
@@ -0,0 +1,251 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from corpus import (
+    INGEST_MODE,
+    POSE_HEADER_PATTERN,
+    YOGA_DATA_PATH,
+    build_splitter,
+    canonical_documents,
+    iter_record_blocks,
+)
+from embeddings import EMBEDDING_MODEL_NAME, embedding_identity
+from lexical import LEXICAL_INDEX_FILENAME
+from metrics import METRICS
+from vector_index import (
+    CHROMA_DB_PATH,
+    VECTOR_BACKEND,
+    apply_vector_changes,
+    chunk_id,
+    index_fingerprint,
+    save_vector_changes,
+)
+
+
+logger = logging.getLogger(__name__)
+
+WATCH_INTERVAL_SECONDS = float(os.getenv("YOGA_WATCH_INTERVAL", "0"))
+# An editor saving in place can be caught mid-write; a change is only
+# applied once the file has stopped changing for this long.
+WATCH_SETTLE_SECONDS = 0.2
+
+
+def _signature(path: str) -> tuple[int, int] | None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def keyed_records(text: str) -> dict:
+    # Pose records are keyed by number so an edit shows up as a change to
+    # one key. Anything else (or a repeated number) is keyed by its text.
+    records = {}
+    for block in iter_record_blocks(text):
+        match = POSE_HEADER_PATTERN.match(block)
+        key = int(match.group(1)) if match else block
+        records[key if key not in records else block] = block
+    return records
+
+
+class CorpusWatcher:
+    def __init__(
+        self,
+        knowledge: dict,
+        on_update=None,
+        data_path: str = YOGA_DATA_PATH,
+        persist_directory: str = CHROMA_DB_PATH,
+        interval: float = WATCH_INTERVAL_SECONDS,
+        mode: str = INGEST_MODE,
+        backend: str = VECTOR_BACKEND,
+        model_name: str | None = None,
+    ):
+        self.knowledge = knowledge
+        self.on_update = on_update
+        self.data_path = data_path
+        self.persist_directory = persist_directory
+        self.interval = interval
+        self.mode = mode
+        self.backend = backend
+        self.model_name = model_name or embedding_identity()
+        self.splitter = build_splitter()
+        self.records = {}
+        self.record_chunks = {}
+        self.chunk_counts = Counter()
+        self.vector_ids = {}
+        self.signature = None
+        self.last_update = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _chunks(self, records: dict) -> dict:
+        if self.mode == "canonical":
+            # A pose document merges every record of that pose, so the
+            # documents are rebuilt from all records and diffed; only the
+            # documents that actually changed are re-embedded.
+            pose_records = ((key, block) for key, block in records.items() if isinstance(key, int))
+            return {None: canonical_documents(pose_records)}
+        return {key: self.splitter.split_text(block) for key, block in records.items()}
+
+    def prime(self) -> None:
+        # Rebuilds the record map the live indexes were built from; chunk
+        # ids are content-addressed, so nothing here touches the indexes.
+        self.signature = _signature(self.data_path)
+        with open(self.data_path, "r", encoding="utf-8") as f:
+            self.records = keyed_records(f.read())
+        self.record_chunks = self._chunks(self.records)
+        self.chunk_counts = Counter(chunk for chunks in self.record_chunks.values() for chunk in chunks)
+        self.vector_ids = {chunk: chunk_id(chunk, self.model_name) for chunk in self.chunk_counts}
+
+    def _read_settled(self):
+        signature = _signature(self.data_path)
+        while True:
+            time.sleep(WATCH_SETTLE_SECONDS)
+            current = _signature(self.data_path)
+            if current == signature:
+                break
+            signature = current
+        if signature is None:
+            return None, None
+        with open(self.data_path, "r", encoding="utf-8") as f:
+            text = f.read()
+        # Written again while it was being read: pick it up next poll.
+        if _signature(self.data_path) != signature:
+            return None, None
+        return signature, text
+
+    def check(self) -> dict | None:
+        if _signature(self.data_path) == self.signature:
+            return None
+        signature, text = self._read_settled()
+        if text is None:
+            return None
+
+        with METRICS.span("hot_reload"):
+            stats = self._apply(keyed_records(text))
+        self.signature = signature
+        if stats["records_changed"] or stats["records_removed"]:
+            self.last_update = stats
+            METRICS.inc("hot_reload_total")
+            logger.info("Reloaded %s: %s", self.data_path, stats)
+        return stats
+
+    def _apply(self, records: dict) -> dict:
+        started = time.perf_counter()
+        changed = {key: block for key, block in records.items() if self.records.get(key) != block}
+        removed = [key for key in self.records if key not in records]
+        if not changed and not removed:
+            return {"records_changed": 0, "records_removed": 0, "chunks_added": 0, "chunks_deleted": 0}
+
+        if self.mode == "canonical":
+            record_chunks = self._chunks(records)
+            counts = Counter(chunk for chunks in record_chunks.values() for chunk in chunks)
+        else:
+            # Chunks are counted because two records can share a chunk; one
+            # is only deleted when no record produces it any more.
+            new_chunks = self._chunks(changed)
+            record_chunks = {**self.record_chunks, **new_chunks}
+            for key in removed:
+                del record_chunks[key]
+            counts = self.chunk_counts.copy()
+            for key in [*removed, *changed]:
+                counts.subtract(self.record_chunks.get(key, ()))
+            for chunks in new_chunks.values():
+                counts.update(chunks)
+            counts = +counts
+        added = [chunk for chunk in counts if chunk not in self.chunk_counts]
+        deleted = [chunk for chunk in self.chunk_counts if chunk not in counts]
+
+        vector_ids = dict(self.vector_ids)
+        for chunk in deleted:
+            del vector_ids[chunk]
+        for chunk in added:
+            vector_ids[chunk] = chunk_id(chunk, self.model_name)
+
+        pose_changes = {key: block for key, block in changed.items() if isinstance(key, int)}
+        pose_removed = [key for key in removed if isinstance(key, int)]
+        pose_table = dict(self.knowledge["pose_table"])
+        for key in pose_removed:
+            pose_table.pop(key, None)
+        pose_table.update(pose_changes)
+
+        # The pose table, facet, lexical and flat indexes are new objects
+        # published together in one assignment, so a query sees either the
+        # old corpus or the new one. Chroma and HNSW are updated in place
+        # just before the swap, so their dense hits can lead it slightly.
+        vector_db = apply_vector_changes(
+            self.knowledge["vector_db"],
+            {vector_ids[chunk]: chunk for chunk in added},
+            [self.vector_ids[chunk] for chunk in deleted],
+            backend=self.backend,
+            model_name=self.model_name,
+        )
+        lexical_index = self.knowledge["lexical_index"].updated(
+            {chunk_id(chunk, EMBEDDING_MODEL_NAME): chunk for chunk in added},
+            [chunk_id(chunk, EMBEDDING_MODEL_NAME) for chunk in deleted],
+        )
+        facet_index = self.knowledge["facet_index"].updated(pose_changes, pose_removed)
+        index_stats = {
+            "added": len(added),
+            "deleted": len(deleted),
+            "total": len(vector_ids),
+            "fingerprint": index_fingerprint(vector_ids.values()),
+        }
+        knowledge = {
+            **self.knowledge,
+            "vector_db": vector_db,
+            "index_stats": index_stats,
+            "lexical_index": lexical_index,
+            "pose_table": pose_table,
+            "facet_index": facet_index,
+        }
+
+        self.knowledge = knowledge
+        self.records = records
+        self.record_chunks = record_chunks
+        self.chunk_counts = counts
+        self.vector_ids = vector_ids
+        if self.on_update is not None:
+            self.on_update(knowledge)
+        stats = {
+            "records_changed": len(changed),
+            "records_removed": len(removed),
+            "chunks_added": len(added),
+            "chunks_deleted": len(deleted),
+            "live_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+
+        # Persisting happens after the swap so it does not delay going live;
+        # a crash before it finishes only means the next start re-syncs.
+        save_vector_changes(
+            vector_db, vector_ids.values(), self.persist_directory,
+            backend=self.backend, model_name=self.model_name
+        )
+        lexical_index.save(
+            os.path.join(self.persist_directory, LEXICAL_INDEX_FILENAME),
+            index_fingerprint(lexical_index.docs)
+        )
+        return stats
+
+    def run(self) -> None:
+        self.prime()
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                METRICS.inc("hot_reload_errors_total", error=type(e).__name__)
+                logger.warning("Hot reload of %s failed, keeping the current index: %r", self.data_path, e)
+
+    def start(self) -> "CorpusWatcher":
+        self._thread = threading.Thread(target=self.run, name="yoga-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()